@@ -0,0 +1,246 @@
+import os
+import math
+import time
+import hashlib
+import multiprocessing
+from collections import namedtuple
+
+# ============================================
+# ADMISSION CONTROL
+# ============================================
+# Upload-processing requests pass through here before their body is read.
+#
+# - Every client (its IP address, or a configured API key) has a token bucket
+#   and gets a 429 once it is empty.
+# - At most MAX_IN_FLIGHT such requests run at once. The last RESERVED_SLOTS
+#   slots are kept for small uploads, so they are not stuck behind large ones.
+# - A request that finds no free slot waits up to ADMISSION_WAIT seconds in a
+#   queue of at most MAX_WAITING requests. Past that it gets a 503.
+# - Both rejections carry a Retry-After estimate.
+#
+# The slot tables and buckets live in shared memory created at import. With
+# the app preloaded in the gunicorn master, all workers share them. A slot
+# held by a process that died is reclaimed. /health, /metrics and the other
+# cheap endpoints are never held back.
+
+ADMISSION_ENABLED = os.environ.get('ATS_ADMISSION', '1').lower() not in ('0', 'false', 'no')
+MAX_IN_FLIGHT = max(int(os.environ.get('ATS_MAX_IN_FLIGHT', '8')), 1)
+RESERVED_SLOTS = min(int(os.environ.get('ATS_RESERVED_SLOTS', '2')), MAX_IN_FLIGHT - 1)
+SMALL_UPLOAD = int(os.environ.get('ATS_SMALL_UPLOAD_KB', '512')) * 1024
+MAX_WAITING = int(os.environ.get('ATS_MAX_WAITING', '16'))
+ADMISSION_WAIT = float(os.environ.get('ATS_ADMISSION_WAIT', '2'))
+# Requests per minute and burst size of each client's bucket (0 disables rate limiting)
+RATE_LIMIT = float(os.environ.get('ATS_RATE_LIMIT', '30'))
+RATE_BURST = float(os.environ.get('ATS_RATE_BURST', '10'))
+# Comma-separated "key" or "key:per_minute:burst"; clients send a key as X-API-Key
+API_KEYS = os.environ.get('ATS_API_KEYS', '')
+# Proxies in front of the app whose X-Forwarded-For entries are trusted
+PROXY_HOPS = int(os.environ.get('ATS_PROXY_HOPS', '0'))
+BUCKET_SLOTS = 1024
+# Open-addressing probe length in the bucket table
+BUCKET_PROBES = 8
+POLL_INTERVAL = 0.02
+
+SMALL = 'small'
+LARGE = 'large'
+
+# An admitted request: its in-flight slot, when it was admitted and how long it waited
+Ticket = namedtuple('Ticket', ['slot', 'admitted', 'waited'])
+
+class Shed(Exception):
+    """The request was not admitted; `status` is 429 or 503 and `retry_after` is in seconds"""
+    def __init__(self, status, reason, message, retry_after):
+        super().__init__(message)
+        self.status = status
+        self.reason = reason
+        self.retry_after = retry_after
+
+def _parse_api_keys(spec):
+    keys = {}
+    for entry in spec.split(','):
+        parts = entry.strip().split(':')
+        if parts[0]:
+            rate = float(parts[1]) if len(parts) > 1 else RATE_LIMIT
+            burst = float(parts[2]) if len(parts) > 2 else RATE_BURST
+            keys[parts[0]] = (rate, burst)
+    return keys
+
+_api_keys = _parse_api_keys(API_KEYS)
+
+class SlotTable:
+    """Fixed-size table of slots in shared memory, each owned by a pid (0 = free)"""
+    def __init__(self, size, lock):
+        self.owners = multiprocessing.RawArray('q', max(size, 1))
+        self.lock = lock
+
+    def _reclaim(self):
+        for position, pid in enumerate(self.owners):
+            if pid:
+                try:
+                    os.kill(pid, 0)
+                except ProcessLookupError:
+                    self.owners[position] = 0
+                except PermissionError:
+                    pass
+
+    def used(self):
+        return sum(1 for pid in self.owners if pid)
+
+    def acquire(self, limit):
+        """Claim a slot if fewer than `limit` are in use; return its position or None"""
+        with self.lock:
+            used = self.used()
+            if used >= limit:
+                self._reclaim()
+                used = self.used()
+                if used >= limit:
+                    return None
+            position = list(self.owners).index(0)
+            self.owners[position] = os.getpid()
+            return position
+
+    def release(self, position):
+        with self.lock:
+            self.owners[position] = 0
+
+_lock = multiprocessing.Lock()
+_in_flight = SlotTable(MAX_IN_FLIGHT, _lock)
+_waiting = SlotTable(MAX_WAITING, _lock)
+# Moving average of how long an admitted request holds its slot
+_service_seconds = multiprocessing.RawValue('d', 1.0)
+_bucket_keys = multiprocessing.RawArray('q', BUCKET_SLOTS)
+_bucket_tokens = multiprocessing.RawArray('d', BUCKET_SLOTS)
+_bucket_updated = multiprocessing.RawArray('d', BUCKET_SLOTS)
+_bucket_lock = multiprocessing.Lock()
+# Coroutines of this process waiting in admit_async() (only touched from the event loop)
+_async_waiting = 0
+
+def request_lane(content_length):
+    """Small uploads may use the reserved slots; uploads of unknown size may not"""
+    return SMALL if content_length is not None and content_length <= SMALL_UPLOAD else LARGE
+
+def client_key(remote_addr, forwarded_for=None, api_key=None):
+    """Rate-limit identity: a configured API key, else the client address"""
+    if api_key and api_key in _api_keys:
+        return f'key:{api_key}'
+    if PROXY_HOPS > 0 and forwarded_for:
+        hops = [hop.strip() for hop in forwarded_for.split(',')]
+        return f'ip:{hops[max(len(hops) - PROXY_HOPS, 0)]}'
+    return f'ip:{remote_addr or ""}'
+
+def submitter_id(api_key):
+    """Stable id of a configured API key (not the key itself), or None for anonymous callers"""
+    if api_key and api_key in _api_keys:
+        return hashlib.blake2b(api_key.encode('utf-8'), digest_size=16).hexdigest()
+    return None
+
+def _retry_after(seconds):
+    return min(max(int(math.ceil(seconds)), 1), 60)
+
+def take_token(client):
+    """Take one token from the client's bucket or raise Shed(429)"""
+    rate, burst = _api_keys.get(client[4:], (RATE_LIMIT, RATE_BURST)) if client.startswith('key:') else (RATE_LIMIT, RATE_BURST)
+    if rate <= 0:
+        return
+    key = int.from_bytes(hashlib.blake2b(client.encode('utf-8'), digest_size=8).digest(), 'big', signed=True) or 1
+    now = time.time()
+    start = key % BUCKET_SLOTS
+    with _bucket_lock:
+        slot = None
+        oldest = None
+        for probe in range(BUCKET_PROBES):
+            position = (start + probe) % BUCKET_SLOTS
+            if _bucket_keys[position] == key:
+                slot = position
+                break
+            if oldest is None or _bucket_updated[position] < _bucket_updated[oldest]:
+                oldest = position
+        if slot is None:
+            # New client: take over the least recently used slot in the probe window
+            slot = oldest
+            _bucket_keys[slot] = key
+            _bucket_tokens[slot] = burst
+            _bucket_updated[slot] = now
+        tokens = min(burst, _bucket_tokens[slot] + (now - _bucket_updated[slot]) * rate / 60)
+        _bucket_updated[slot] = now
+        if tokens < 1:
+            _bucket_tokens[slot] = tokens
+            raise Shed(429, 'rate', 'Rate limit exceeded', _retry_after((1 - tokens) * 60 / rate))
+        _bucket_tokens[slot] = tokens - 1
+
+def _slot_limit(lane):
+    return MAX_IN_FLIGHT if lane == SMALL else MAX_IN_FLIGHT - RESERVED_SLOTS
+
+def _busy_retry_after():
+    # Time for the queue ahead to drain through the slots, roughly
+    return _retry_after(_service_seconds.value * (_waiting.used() + 1) / MAX_IN_FLIGHT)
+
+def _enter_queue():
+    position = _waiting.acquire(MAX_WAITING)
+    if position is None:
+        raise Shed(503, 'queue', 'Server busy, retry later', _busy_retry_after())
+    return position
+
+def _timed_out():
+    return Shed(503, 'timeout', 'Server busy, retry later', _busy_retry_after())
+
+def admit(lane, client):
+    """Admit a request or raise Shed; returns the Ticket to pass to release()"""
+    take_token(client)
+    started = time.monotonic()
+    position = _in_flight.acquire(_slot_limit(lane))
+    if position is None:
+        queued = _enter_queue()
+        try:
+            while position is None:
+                if time.monotonic() - started >= ADMISSION_WAIT:
+                    raise _timed_out()
+                time.sleep(POLL_INTERVAL)
+                position = _in_flight.acquire(_slot_limit(lane))
+        finally:
+            _waiting.release(queued)
+    now = time.monotonic()
+    return Ticket(position, now, now - started)
+
+async def admit_async(lane):
+    """admit() for the event loop, without blocking it and without taking a token.
+
+    The ASGI entry point receives bodies on the event loop, where a slow
+    upload costs nothing, so it charges the client with take_token() before
+    the body and only waits for a slot once the body has arrived. A waiting
+    coroutine holds no thread either, so it is bounded by ADMISSION_WAIT
+    alone, not by the MAX_WAITING queue.
+    """
+    import asyncio  # only the ASGI entry point admits from a coroutine
+    global _async_waiting
+    started = time.monotonic()
+    position = _in_flight.acquire(_slot_limit(lane))
+    if position is None:
+        _async_waiting += 1
+        try:
+            while position is None:
+                if time.monotonic() - started >= ADMISSION_WAIT:
+                    raise _timed_out()
+                await asyncio.sleep(POLL_INTERVAL)
+                position = _in_flight.acquire(_slot_limit(lane))
+        finally:
+            _async_waiting -= 1
+    now = time.monotonic()
+    return Ticket(position, now, now - started)
+
+def release(ticket):
+    """Free an admitted request's slot and fold its duration into the service time estimate"""
+    _in_flight.release(ticket.slot)
+    _service_seconds.value = 0.8 * _service_seconds.value + 0.2 * (time.monotonic() - ticket.admitted)
+
+def admission_stats():
+    return {
+        'enabled': ADMISSION_ENABLED,
+        'in_flight': _in_flight.used(),
+        'max_in_flight': MAX_IN_FLIGHT,
+        'reserved_slots': RESERVED_SLOTS,
+        'waiting': _waiting.used(),
+        'max_waiting': MAX_WAITING,
+        'waiting_async': _async_waiting,
+        'service_seconds': round(_service_seconds.value, 3)
+    }
@@ -1,49 +1,179 @@
-from flask import Flask, render_template, request, jsonify
+import time
+BOOT_STARTED = time.perf_counter()
+
+from flask import Flask, Request, Response, g, render_template, request, jsonify
 from flask_cors import CORS  
 import os
-import PyPDF2
-import docx
+import io
+import json
+import mmap
+import hashlib
 import re
 import tempfile  
-import time
 import threading
+import zipfile
+import sqlite3
+from contextlib import contextmanager
 from datetime import datetime
+from werkzeug.exceptions import RequestEntityTooLarge, UnsupportedMediaType
 from werkzeug.utils import secure_filename
+from admission import (
+    ADMISSION_ENABLED, Shed, admission_stats, admit, client_key, release, request_lane, submitter_id
+)
+from batch import BATCH_MAX_FILES, csv_lines, documents_from_zip, iter_batch, ndjson_lines
+from cache import ResultCache
+from engine import DocumentRejected, DocumentTimeout, map_documents, pool_stats, run_document
+from jobs import callback_allowed, ensure_workers, get_job, queue_stats, submit_job
+from keywords import (
+    final_score, get_profile, get_profiles, list_profiles, match_keywords, profile_load_stats, refresh_profiles, request_reload
+)
+from matching import MATCH_MAX_JOBS, MATCH_TOP, rank_resumes
+from roles import ROLES_TOP, rank_roles
+from search import FLAG_COLUMNS, SEARCH_INDEX, index_resume, search
+from probe import NoTextLayer, check_text_layer
+from dedupe import DEDUPE_MODE, DEDUPE_MODES, check_document, duplicate_groups, minhash_signature
+from document import Document, as_document
+from sections import PREAMBLE
+from sessions import create_session, delete_session, load_session, save_session
+import metrics
+
+IMPORTS_SECONDS = time.perf_counter() - BOOT_STARTED
+
+# PDF parsing stops after MAX_PAGES pages or MAX_CHARS characters, whichever comes first
+MAX_PAGES = int(os.environ.get('ATS_MAX_PAGES', '50'))
+MAX_CHARS = int(os.environ.get('ATS_MAX_CHARS', '100000'))
+
+# Uploads up to this size stay in memory; larger ones spool to an unnamed temp file
+SPOOL_THRESHOLD = int(os.environ.get('ATS_SPOOL_THRESHOLD', 8 * 1024 * 1024))
+
+# ============================================
+# STREAMING UPLOAD CHECKS
+# ============================================
+# Werkzeug hands each uploaded file to an UploadSpool chunk by chunk while the
+# request body is still arriving. The spool sniffs the leading bytes and
+# enforces its file type's size limit as data comes in, so an upload with the
+# wrong content or size is rejected without reading the rest of the body. It
+# also hashes the bytes it receives, so the digest needs no second pass.
+
+MB = 1024 * 1024
+UPLOAD_LIMITS = {
+    'pdf': int(os.environ.get('ATS_MAX_PDF_MB', '20')) * MB,
+    'docx': int(os.environ.get('ATS_MAX_DOCX_MB', '10')) * MB,
+    'zip': int(os.environ.get('ATS_MAX_ZIP_MB', '50')) * MB
+}
+# A PDF header may follow some junk within the first KB; DOCX files are ZIP archives
+SNIFF_BYTES = 1024
+ZIP_SIGNATURES = (b'PK\x03\x04', b'PK\x05\x06')
+
+def upload_kind(filename):
+    extension = filename.rsplit('.', 1)[1].lower() if filename and '.' in filename else ''
+    return extension if extension in UPLOAD_LIMITS else None
+
+def sniff_upload(kind, head, complete):
+    """True/False once the leading bytes prove or disprove the type, None while more are needed"""
+    if kind == 'pdf':
+        if b'%PDF-' in head:
+            return True
+        return False if complete or len(head) >= SNIFF_BYTES else None
+    if len(head) < 4 and not complete:
+        return None
+    return head.startswith(ZIP_SIGNATURES)
+
+class UploadSpool(tempfile.SpooledTemporaryFile):
+    """Spooled upload that validates its type and size and hashes its bytes while they are written"""
+    def __init__(self, filename):
+        super().__init__(max_size=SPOOL_THRESHOLD, mode='rb+')
+        self.kind = upload_kind(filename)
+        self.received = 0
+        self.head = b''
+        self.sniffed = False
+        self.sha256 = hashlib.sha256()
+        if filename and self.kind is None:
+            raise UnsupportedMediaType('Please upload PDF or DOCX file')
+    
+    def _sniff(self, complete):
+        verdict = sniff_upload(self.kind, self.head, complete)
+        if verdict is False:
+            raise UnsupportedMediaType(f'File content is not a valid {self.kind.upper()}')
+        self.sniffed = verdict is True
+    
+    def write(self, data):
+        self.received += len(data)
+        limit = UPLOAD_LIMITS.get(self.kind, 0)
+        if self.received > limit:
+            if self.kind is None:
+                raise UnsupportedMediaType('Please upload PDF or DOCX file')
+            raise RequestEntityTooLarge(f'{self.kind.upper()} uploads are limited to {limit // MB}MB')
+        if not self.sniffed:
+            self.head += data[:SNIFF_BYTES - len(self.head)]
+            self._sniff(complete=False)
+        self.sha256.update(data)
+        return super().write(data)
+    
+    def seek(self, *args):
+        # Werkzeug rewinds each file once it is complete; short files are judged then
+        if not self.sniffed and self.kind is not None:
+            self._sniff(complete=True)
+        return super().seek(*args)
+
+class UploadRequest(Request):
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return UploadSpool(filename)
 
 app = Flask(__name__)
+app.request_class = UploadRequest
 CORS(app)  
 
-app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024  # 50MB
-app.config['UPLOAD_FOLDER'] = tempfile.gettempdir()
+# Whole request bodies; single files are held to UPLOAD_LIMITS while they arrive
+app.config['MAX_CONTENT_LENGTH'] = 50 * MB
+app.config['ADMIN_TOKEN'] = os.environ.get('ADMIN_TOKEN', '')
 ALLOWED_EXTENSIONS = {'pdf', 'docx'}
 
+# Bump whenever scoring or recommendation logic changes so cached analyses are not reused
+SCORING_VERSION = '5'
+# Bump whenever extracted text changes shape so cached text is not reused
+EXTRACTION_VERSION = '3'
+
+CACHE_DIR = os.environ.get('ATS_CACHE_DIR') or None
+CACHE_SIZE = int(os.environ.get('ATS_CACHE_SIZE', '256'))
+CACHE_TTL = int(os.environ.get('ATS_CACHE_TTL', '3600'))
+text_cache = ResultCache('text', CACHE_SIZE, CACHE_TTL, CACHE_DIR)
+analysis_cache = ResultCache('analysis', CACHE_SIZE, CACHE_TTL, CACHE_DIR)
+
 # ============================================
-# KEEP ALIVE FUNCTION
+# STARTUP REPORT
 # ============================================
-def keep_alive():
-    while True:
-        time.sleep(240)
-        try:
-            print(f"[Keep Alive] Server active at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        except:
-            pass
-
-if os.environ.get('RENDER') == 'true':
-    thread = threading.Thread(target=keep_alive, daemon=True)
-    thread.start()
-    print("✅ Keep-alive thread started - Server will not sleep")
+# Time to first response after a cold start is what users of a sleeping
+# instance feel, so boot phases are timed from the first line of this module
+# and reported on /health (the first response is timed per worker).
+startup = {
+    'imports_seconds': round(IMPORTS_SECONDS, 4),
+    'ready_seconds': None,
+    'first_response_seconds': None
+}
 
 # ============================================
 # HEALTH CHECK ENDPOINT
 # ============================================
-@app.route('/health', methods=['GET'])
-def health():
-    return jsonify({
+def health_status():
+    return {
         'status': 'awake',
         'time': datetime.now().isoformat(),
         'message': 'Server is ready to accept uploads',
-        'active_threads': threading.active_count()
-    }), 200
+        'active_threads': threading.active_count(),
+        'startup': dict(startup, pid=os.getpid(), profiles=profile_load_stats()),
+        'cache': {
+            'text': text_cache.stats(),
+            'analysis': analysis_cache.stats()
+        },
+        'extraction_pool': pool_stats(),
+        'jobs': queue_stats(),
+        'admission': admission_stats()
+    }
+
+@app.route('/health', methods=['GET'])
+def health():
+    return jsonify(health_status()), 200
 
 # ============================================
 # OPTIONS method for CORS preflight
@@ -66,160 +196,247 @@ def handle_options_check():
     response.headers.add('Access-Control-Max-Age', '3600')
     return response
 
-# ATS Keywords Database
-ATS_DATA = {
-    'technical_skills': [
-        'python', 'java', 'javascript', 'c++', 'c#', 'ruby', 'php', 'swift', 'kotlin',
-        'typescript', 'go', 'rust', 'scala', 'perl', 'r', 'matlab',
-        'html', 'css', 'react', 'angular', 'vue', 'node.js', 'express', 'django',
-        'flask', 'spring', 'bootstrap', 'jquery', 'ajax', 'rest api', 'graphql',
-        'sql', 'mysql', 'postgresql', 'mongodb', 'oracle', 'redis', 'elasticsearch',
-        'aws', 'azure', 'gcp', 'docker', 'kubernetes', 'jenkins', 'git', 'github',
-        'machine learning', 'deep learning', 'ai', 'data science', 'tensorflow',
-        'pandas', 'numpy', 'jira', 'excel', 'tableau', 'power bi'
-    ],
-    
-    'soft_skills': [
-        'leadership', 'teamwork', 'communication', 'problem solving',
-        'critical thinking', 'time management', 'project management',
-        'adaptability', 'creativity', 'collaboration', 'analytical',
-        'decision making', 'conflict resolution', 'negotiation',
-        'presentation', 'public speaking', 'writing', 'interpersonal',
-        'emotional intelligence', 'empathy', 'mentoring', 'customer service'
-    ],
-    
-    'action_verbs': [
-        'developed', 'managed', 'created', 'implemented', 'designed',
-        'led', 'achieved', 'improved', 'increased', 'reduced',
-        'built', 'coordinated', 'established', 'generated', 'launched',
-        'delivered', 'executed', 'facilitated', 'guided', 'initiated',
-        'organized', 'performed', 'planned', 'produced', 'resolved',
-        'streamlined', 'strengthened', 'supervised', 'trained', 'transformed',
-        'analyzed', 'architected'
-    ],
-    
-    'education_keywords': [
-        'bachelor', 'master', 'phd', 'b.tech', 'm.tech', 'b.e.', 'm.e.',
-        'b.sc', 'm.sc', 'b.com', 'm.com', 'b.a.', 'm.a.', 'mba', 'bca', 'mca',
-        'diploma', 'certification', 'degree', 'university', 'college',
-        'gpa', 'cgpa', 'honors', 'distinction', 'merit', 'scholarship'
-    ],
-    
-    'certifications': [
-        'aws certified', 'azure certified', 'google certified', 'pmp',
-        'prince2', 'scrum master', 'csm', 'psm', 'safe', 'itil',
-        'ccna', 'ccnp', 'ceh', 'cissp', 'cisa', 'cism',
-        'comptia', 'microsoft certified', 'oracle certified', 'salesforce',
-        'tableau certified', 'power bi certified', 'six sigma', 'lean'
-    ]
-}
-
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def extract_text_from_pdf(filepath):
-    text = ""
+class MappedUpload(mmap.mmap):
+    """Read-only memory map with the file-object methods zipfile expects"""
+    def seekable(self):
+        return True
+
+    def readable(self):
+        return True
+
+@contextmanager
+def open_upload(stream):
+    """Yield a seekable binary view of an upload without writing it to a named file.
+
+    Small uploads are read straight from the in-memory spool; uploads above
+    SPOOL_THRESHOLD are memory-mapped from their spooled temp file.
+    """
+    stream.seek(0, os.SEEK_END)
+    size = stream.tell()
+    stream.seek(0)
+    if size <= SPOOL_THRESHOLD:
+        yield stream
+        return
+    with MappedUpload(stream.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        yield mapped
+
+def content_digest(buffer):
+    """SHA-256 hex digest of an upload; an UploadSpool already hashed its bytes while receiving them"""
+    if isinstance(buffer, UploadSpool):
+        return buffer.sha256.hexdigest()
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: buffer.read(1024 * 1024), b''):
+        digest.update(chunk)
+    buffer.seek(0)
+    return digest.hexdigest()
+
+def iter_pdf_pages(source, max_pages=None):
+    """Yield the text of each PDF page in order, parsing one page at a time"""
+    import PyPDF2  # imported on first use: slow to load and not needed to boot
+    pdf_reader = PyPDF2.PdfReader(source)
+    for number, page in enumerate(pdf_reader.pages, 1):
+        if max_pages is not None and number > max_pages:
+            return
+        yield page.extract_text() or ""
+
+def extract_text_from_pdf(source, max_pages=None, max_chars=None):
+    """Extract text from a PDF path or seekable binary stream.
+
+    Pages are separated by a form feed so matches can be traced back to their
+    page, and parsing stops early once max_pages or max_chars is reached.
+    """
+    pages = []
+    size = 0
     try:
-        with open(filepath, 'rb') as file:
-            pdf_reader = PyPDF2.PdfReader(file)
-            for page in pdf_reader.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text + "\n"
+        for page_text in iter_pdf_pages(source, max_pages):
+            pages.append(page_text)
+            size += len(page_text)
+            if max_chars is not None and size >= max_chars:
+                break
     except Exception as e:
         print(f"PDF extraction error: {e}")
-    return text
+    return "\n\f".join(pages) + "\n" if pages else ""
+
+# WordprocessingML element names, as ElementTree reports them
+W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+W_BODY, W_P, W_R, W_T, W_TAB, W_BR, W_CR = W + 'body', W + 'p', W + 'r', W + 't', W + 'tab', W + 'br', W + 'cr'
+W_TBL, W_TR, W_TC = W + 'tbl', W + 'tr', W + 'tc'
+OFFICE_DOCUMENT_REL = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument'
+
+def docx_paragraph_text(paragraph):
+    """Text of the runs directly in a <w:p>, with tabs and breaks mapped as python-docx does"""
+    pieces = []
+    for run in paragraph:
+        if run.tag != W_R:
+            continue
+        for child in run:
+            if child.tag == W_T:
+                pieces.append(child.text or '')
+            elif child.tag == W_TAB:
+                pieces.append('\t')
+            elif child.tag == W_BR or child.tag == W_CR:
+                pieces.append('\n')
+    return ''.join(pieces)
+
+def docx_row_text(row):
+    """Non-blank cell texts of a <w:tr>, each followed by a space; every cell is read once"""
+    pieces = []
+    for cell in row:
+        if cell.tag != W_TC:
+            continue
+        text = '\n'.join(docx_paragraph_text(paragraph) for paragraph in cell if paragraph.tag == W_P)
+        if text.strip():
+            pieces.append(text + ' ')
+    return ''.join(pieces)
 
-def extract_text_from_docx(filepath):
-    text = ""
+def docx_document_part(archive):
+    """Name of the main document part, as declared in the package relationships"""
+    from xml.etree import ElementTree
     try:
-        doc = docx.Document(filepath)
-        for paragraph in doc.paragraphs:
-            if paragraph.text.strip():
-                text += paragraph.text + "\n"
-        for table in doc.tables:
-            for row in table.rows:
-                for cell in row.cells:
-                    if cell.text.strip():
-                        text += cell.text + " "
-                text += "\n"
+        relationships = ElementTree.fromstring(archive.read('_rels/.rels'))
+    except (KeyError, ElementTree.ParseError):
+        return 'word/document.xml'
+    for relationship in relationships:
+        if relationship.get('Type') == OFFICE_DOCUMENT_REL:
+            return relationship.get('Target', '').lstrip('/')
+    return 'word/document.xml'
+
+def extract_text_from_docx(source):
+    """Extract text from a DOCX path or seekable binary stream.
+
+    The document part is streamed out of the zip and parsed incrementally.
+    Body paragraphs and table rows are emitted in document order, and each is
+    dropped from the tree once read, so memory is bounded by the largest
+    paragraph or row rather than the document. Paragraph and cell text are
+    read as python-docx reads them, except that a merged cell is read once
+    instead of once per grid column or row it spans.
+    """
+    from xml.etree import ElementTree  # imported on first use, like the other parsers
+    parts = []
+    try:
+        with zipfile.ZipFile(source) as archive:
+            with archive.open(docx_document_part(archive)) as xml:
+                depth = 0
+                body = None
+                table = None
+                for event, element in ElementTree.iterparse(xml, events=('start', 'end')):
+                    if event == 'start':
+                        depth += 1
+                        if depth == 2 and element.tag == W_BODY:
+                            body = element
+                        elif depth == 3 and body is not None and element.tag == W_TBL:
+                            table = element
+                        continue
+                    level = depth
+                    depth -= 1
+                    if level == 4 and table is not None and element.tag == W_TR:
+                        parts.append(docx_row_text(element) + '\n')
+                        table.remove(element)
+                    elif level == 3 and body is not None:
+                        if element.tag == W_P:
+                            text = docx_paragraph_text(element)
+                            if text.strip():
+                                parts.append(text + '\n')
+                        body.remove(element)
+                        table = None
+                    elif level == 2:
+                        body = None
     except Exception as e:
         print(f"DOCX extraction error: {e}")
-    return text
+    return ''.join(parts)
+
+# Achievement matchers, compiled once
+ACHIEVEMENT_KEYWORDS = [
+    'achievement', 'award', 'won', 'secured', 'rank', 'position',
+    'certificate', 'recognition', 'honor', 'medal', 'trophy',
+    'scholarship', 'distinction', 'merit', 'excellence',
+    'first prize', 'second prize', 'third prize', 'winner',
+    'champion', 'gold medal', 'silver medal', 'bronze medal',
+    'topper', 'outstanding', 'exceptional', 'performance'
+]
+ACHIEVEMENT_KEYWORD_PATTERN = re.compile('|'.join(map(re.escape, ACHIEVEMENT_KEYWORDS)))
+ACHIEVEMENT_HEADER_PATTERN = re.compile('achievement|award|honor|recognition')
+SECTION_BREAK_PATTERN = re.compile('skill|education|project|experience')
+ACHIEVEMENT_BULLETS = ('•', '-', '*', '✓')
+BULLET_PATTERN = re.compile(r'[•\-*✓]\s*(.*?)(?:\n|$)')
+
+# Achievement phrases counted anywhere in the text, grouped by the word they
+# start with. One scan finds those anchor words and the phrases are only tried
+# there; each phrase keeps its own end offset so its count matches a separate
+# non-overlapping findall. The anchors' first letters are all distinct, and
+# only that letter is consumed so overlapping anchors are still found.
+ACHIEVEMENT_PHRASES = {
+    'secured': [re.compile(r'secured\s+(\d+\w*\s+)?rank'), re.compile(r'secured\s+\d+\s*%')],
+    'won': [re.compile(r'won\s+(\d+\w*\s+)?prize')],
+    'achieved': [re.compile(r'achieved\s+\d+')],
+    'ranked': [re.compile(r'ranked\s+#?\d+')],
+    'position': [re.compile(r'position\s+#?\d+')],
+    'topper': [re.compile(r'topper\s+in')],
+    'outstanding': [re.compile(r'outstanding\s+performance')],
+    'excellence': [re.compile(r'excellence\s+award')]
+}
+ACHIEVEMENT_ANCHORS = {word[0]: phrases for word, phrases in ACHIEVEMENT_PHRASES.items()}
+ACHIEVEMENT_ANCHOR_PATTERN = re.compile('|'.join(f'{word[0]}(?={word[1:]})' for word in ACHIEVEMENT_PHRASES))
 
-def extract_achievements(text):
-    """Extract achievements from resume text"""
+def count_achievement_phrases(text_lower):
+    count = 0
+    phrase_ends = {}
+    for anchor in ACHIEVEMENT_ANCHOR_PATTERN.finditer(text_lower):
+        position = anchor.start()
+        for phrase in ACHIEVEMENT_ANCHORS[anchor.group()]:
+            if position < phrase_ends.get(phrase, 0):
+                continue
+            match = phrase.match(text_lower, position)
+            if match:
+                phrase_ends[phrase] = match.end()
+                count += 1
+    return count
+
+def extract_achievements(document):
+    """Extract achievements from resume text (a Document or a string)"""
+    document = as_document(document)
     achievements = {
         'has_achievements': False,
         'achievement_count': 0,
         'achievement_list': [],
         'achievement_score': 0
     }
-    
-    text_lower = text.lower()
-    lines = text.split('\n')
-    
-    # Achievement-related keywords
-    achievement_keywords = [
-        'achievement', 'award', 'won', 'secured', 'rank', 'position',
-        'certificate', 'recognition', 'honor', 'medal', 'trophy',
-        'scholarship', 'distinction', 'merit', 'excellence',
-        'first prize', 'second prize', 'third prize', 'winner',
-        'champion', 'gold medal', 'silver medal', 'bronze medal',
-        'topper', 'outstanding', 'exceptional', 'performance'
-    ]
-    
-    # Look for achievement section
-    achievement_section_found = False
-    current_section = ""
-    
-    for i, line in enumerate(lines):
-        line_lower = line.lower().strip()
-        
-        # Check if this line starts an achievement section
-        if any(keyword in line_lower for keyword in ['achievement', 'award', 'honor', 'recognition']):
+    achievement_list = achievements['achievement_list']
+
+    # Classify each line once. A header line opens the achievement section,
+    # which then runs to the end of the text.
+    in_section = False
+    for line, line_lower in zip(document.lines, document.lower_lines):
+        stripped = line.strip()
+        if not stripped:
+            continue
+        line_lower = line_lower.strip()
+
+        if ACHIEVEMENT_HEADER_PATTERN.search(line_lower):
             if ':' in line or len(line.split()) < 8:  # Likely a section header
-                achievement_section_found = True
-                current_section = "achievements"
+                in_section = True
                 continue
-        
-        # If we're in achievement section, collect achievements
-        if achievement_section_found and current_section == "achievements":
-            if line.strip() and not any(keyword in line_lower for keyword in ['skill', 'education', 'project', 'experience']):
-                # Check if this line contains achievement keywords or bullet points
-                if any(keyword in line_lower for keyword in achievement_keywords) or line.strip().startswith(('•', '-', '*', '✓')):
-                    achievements['achievement_list'].append(line.strip())
-    
-    # Also scan entire text for achievement patterns
-    achievement_patterns = [
-        r'secured\s+(\d+\w*\s+)?rank',
-        r'won\s+(\d+\w*\s+)?prize',
-        r'secured\s+\d+\s*%',
-        r'achieved\s+\d+',
-        r'ranked\s+#?\d+',
-        r'position\s+#?\d+',
-        r'topper\s+in',
-        r'outstanding\s+performance',
-        r'excellence\s+award'
-    ]
-    
-    for pattern in achievement_patterns:
-        matches = re.findall(pattern, text_lower)
-        if matches:
-            achievements['achievement_count'] += len(matches)
-    
-    # Count achievements from list
-    achievements['achievement_count'] += len(achievements['achievement_list'])
-    
-    # Check for bullet points that might contain achievements
-    bullet_lines = re.findall(r'[•\-*✓]\s*(.*?)(?:\n|$)', text)
-    for line in bullet_lines:
-        line_lower = line.lower()
-        if any(keyword in line_lower for keyword in achievement_keywords):
-            if line not in achievements['achievement_list']:
-                achievements['achievement_list'].append(line.strip())
-                achievements['achievement_count'] += 1
-    
+
+        if in_section and not SECTION_BREAK_PATTERN.search(line_lower):
+            # Keep lines with achievement keywords or bullet points
+            if stripped.startswith(ACHIEVEMENT_BULLETS) or ACHIEVEMENT_KEYWORD_PATTERN.search(line_lower):
+                achievement_list.append(stripped)
+
+    # Achievement phrases anywhere in the text, plus the section entries
+    achievements['achievement_count'] = count_achievement_phrases(document.lower) + len(achievement_list)
+
+    # Bullet points elsewhere that mention an achievement. Membership is
+    # tested with the bullet text as captured but the stripped text is stored.
+    seen = set(achievement_list)
+    for line in BULLET_PATTERN.findall(document.text):
+        if line not in seen and ACHIEVEMENT_KEYWORD_PATTERN.search(line.lower()):
+            seen.add(line.strip())
+            achievement_list.append(line.strip())
+            achievements['achievement_count'] += 1
+
     # Calculate achievement score
     if achievements['achievement_count'] >= 3:
         achievements['achievement_score'] = 10
@@ -229,13 +446,47 @@ def extract_achievements(text):
         achievements['achievement_score'] = 4
     else:
         achievements['achievement_score'] = 0
-    
+
     achievements['has_achievements'] = achievements['achievement_count'] > 0
-    
+
     return achievements
 
-def extract_contact_info(text):
-    """Extract contact information from resume - QR codes based on text only"""
+# Contact detectors, compiled once. Phone numbers, profile links, QR mentions
+# and portfolio mentions come out of one case-insensitive scan; emails get a
+# scan of their own because an address may itself contain a phone number or a
+# "github"/"linkedin" mention that must still be reported.
+EMAIL_PATTERN = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b')
+CONTACT_PATTERN = re.compile(r'''
+    # Every branch starts with one of these; cheap rejection of all other positions
+    (?=[06-9+gilmpq])(?:
+    (?<!\w)0?(?P<phone>[6-9]\d{9}|[6-9]\d{4}\s\d{5})(?!\w)       # 9876543210, 098765 43210, 91 9876543210
+  | (?<!\w)(?P<phone_dashed>[6-9]\d{4}-\d{5})(?!\w)              # 98765-43210
+  | \+91(?P<phone_intl>[6-9]\d{9})(?!\w)                          # +919876543210
+  | (?<=\w)\+91(?P<phone_intl_spaced>[6-9]\d{4}\s\d{5})(?!\w)    # tel:+9198765 43210
+  | (?P<linkedin>linkedin)(?=(?P<linkedin_url>\.com/in/[\w\-]+))?
+  | (?P<linkedin_qr>(?:li|in)\s*qr)
+  | (?P<github>github)(?=(?P<github_url>\.com/[\w\-]+))?
+  | (?P<github_qr>gh\s*qr)
+  | (?P<qr_code>\bqr(?:code)?\b)
+  | (?P<portfolio>portfolio|personal\ website|my\ website)
+    )
+''', re.IGNORECASE | re.VERBOSE)
+
+CONTACT_FLAGS = {
+    'linkedin': ('linkedin', 'linkedin_qr', 'qr_code'),
+    'linkedin_qr': ('linkedin', 'linkedin_qr', 'qr_code'),
+    'github': ('github', 'github_qr', 'qr_code'),
+    'github_qr': ('github', 'github_qr', 'qr_code'),
+    'qr_code': ('qr_code',),
+    'portfolio': ()
+}
+
+def extract_contact_info(document):
+    """Extract contact information from resume - QR codes based on text only.
+
+    Besides the flags, `hits` lists every detected email, phone, profile link,
+    QR and portfolio mention with its [start, end] span in the text.
+    """
     info = {
         'email': [],
         'phone': [],
@@ -244,138 +495,49 @@ def extract_contact_info(text):
         'linkedin_qr': False,
         'github_qr': False,
         'qr_code': False,
-        'portfolio': False
+        'portfolio': False,
+        'hits': []
     }
-    
-    # Email pattern
-    email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-    emails = re.findall(email_pattern, text)
-    info['email'] = list(set(emails))
-    
-    # Phone patterns (Indian numbers with spaces)
-    phone_patterns = [
-        r'\b(?:\+91|0)?[6-9]\d{9}\b',
-        r'\b(?:\+91|0)?[6-9]\d{4}\s\d{5}\b',
-        r'\b(?:\+91|0|91)\s[6-9]\d{9}\b',
-        r'\b[6-9]\d{4}-\d{5}\b',
-        r'\+91[6-9]\d{9}\b',
-    ]
-    
-    phones = []
-    for pattern in phone_patterns:
-        found = re.findall(pattern, text)
-        phones.extend(found)
-    
-    cleaned_phones = []
-    for phone in phones:
-        clean = re.sub(r'[\s\-]', '', phone)
-        if clean.startswith('+91'):
-            clean = clean[3:]
-        elif clean.startswith('91') and len(clean) > 10:
-            clean = clean[2:]
-        elif clean.startswith('0') and len(clean) > 10:
-            clean = clean[1:]
-        
-        if len(clean) == 10 and clean[0] in '6789':
-            cleaned_phones.append(clean)
-    
-    info['phone'] = list(set(cleaned_phones))
-    
-    # QR Code Detection
-    text_lower = text.lower()
-    
-    # Check for general QR code mentions
-    if re.search(r'\bqr\b|\bqrcode\b|\bqr code\b', text_lower):
-        info['qr_code'] = True
-    
-    # LinkedIn QR Detection
-    linkedin_qr_patterns = [
-        r'linkedin\s*qr',
-        r'linkedin\s*:',
-        r'linkedin',
-        r'li\s*qr',
-        r'in\s*qr',
-    ]
-    
-    for pattern in linkedin_qr_patterns:
-        if re.search(pattern, text_lower):
-            info['linkedin'] = True
-            info['linkedin_qr'] = True
-            info['qr_code'] = True
-            break
-    
-    # GitHub QR Detection
-    github_qr_patterns = [
-        r'github\s*qr',
-        r'github\s*:',
-        r'github',
-        r'gh\s*qr',
-    ]
-    
-    for pattern in github_qr_patterns:
-        if re.search(pattern, text_lower):
-            info['github'] = True
-            info['github_qr'] = True
-            info['qr_code'] = True
-            break
-    
-    # Regular URLs
-    if re.search(r'linkedin\.com/in/[\w\-]+', text_lower):
-        info['linkedin'] = True
-    
-    if re.search(r'github\.com/[\w\-]+', text_lower):
-        info['github'] = True
-    
-    # Portfolio detection
-    portfolio_patterns = [r'portfolio', r'personal website', r'my website']
-    for pattern in portfolio_patterns:
-        if re.search(pattern, text_lower) and not info['github'] and not info['linkedin']:
-            info['portfolio'] = True
-            break
-    
+    text = as_document(document).text
+    hits = info['hits']
+    emails = {}
+    phones = {}
+    portfolio = False
+
+    for match in EMAIL_PATTERN.finditer(text) if '@' in text else ():
+        emails.setdefault(match.group(), None)
+        hits.append({'type': 'email', 'value': match.group(), 'span': list(match.span())})
+
+    for match in CONTACT_PATTERN.finditer(text):
+        kind = match.lastgroup
+        if kind.startswith('phone'):
+            # The number is reported without country/trunk prefix or separators
+            number = match.group(kind).replace('-', '')
+            number = ''.join(number.split())
+            phones.setdefault(number, None)
+            hits.append({'type': 'phone', 'value': number, 'span': list(match.span())})
+            continue
+        if kind.endswith('_url'):
+            # The URL path sits in a lookahead so it is not consumed by the scan
+            site = kind[:-4]
+            for flag in CONTACT_FLAGS[site]:
+                info[flag] = True
+            hits.append({'type': kind, 'value': match.group() + match.group(kind),
+                         'span': [match.start(), match.end(kind)]})
+            continue
+        for flag in CONTACT_FLAGS[kind]:
+            info[flag] = True
+        portfolio = portfolio or kind == 'portfolio'
+        hits.append({'type': kind, 'value': match.group(), 'span': list(match.span())})
+
+    hits.sort(key=lambda hit: hit['span'][0])
+    info['email'] = list(emails)
+    info['phone'] = list(phones)
+    info['portfolio'] = portfolio and not info['github'] and not info['linkedin']
     return info
 
-def calculate_ats_score(text):
-    """Calculate ATS score based on various factors"""
-    text_lower = text.lower()
-    words = text.split()
-    
-    # Find keywords
-    found_keywords = {
-        'technical_skills': [],
-        'soft_skills': [],
-        'action_verbs': [],
-        'education_keywords': [],
-        'certifications': []
-    }
-    
-    for category, keywords in ATS_DATA.items():
-        for keyword in keywords:
-            if keyword.lower() in text_lower:
-                found_keywords[category].append(keyword)
-    
-    # Calculate category scores
-    category_scores = {}
-    total_possible = 0
-    total_found = 0
-    
-    for category, keywords in ATS_DATA.items():
-        possible = len(keywords)
-        found = len(found_keywords[category])
-        total_possible += possible
-        total_found += found
-        category_scores[category] = round((found / possible) * 100, 1) if possible > 0 else 0
-    
-    # Overall ATS score
-    ats_score = round((total_found / total_possible) * 100, 1) if total_possible > 0 else 0
-    
-    # Extract contact information
-    contact_info = extract_contact_info(text)
-    
-    # Extract achievements
-    achievements = extract_achievements(text)
-    
-    # Contact information score
+def contact_points(contact_info):
+    """Contact information score"""
     contact_score = 0
     if contact_info['email']:
         contact_score += 3
@@ -391,41 +553,101 @@ def calculate_ats_score(text):
         contact_score += 2
     if contact_info['qr_code']:
         contact_score += 1
-    
-    # Length score
-    word_count = len(words)
+    return contact_score
+
+def length_points(word_count):
+    """Length score"""
     if word_count < 300:
-        length_score = 2
+        return 2
     elif word_count < 400:
-        length_score = 5
+        return 5
     elif word_count < 600:
-        length_score = 8
+        return 8
     elif word_count < 800:
-        length_score = 10
+        return 10
     else:
-        length_score = 7
+        return 7
+
+def calculate_ats_score(document, profile=None, timings=None, keyword_matches=None):
+    """Calculate ATS score based on various factors.
+
+    `document` is a Document (or the resume text). When a `timings` dict is given, the seconds spent on keyword matching,
+    contact extraction and achievement scanning are recorded in it.
+    `keyword_matches` may supply match_keywords() results computed elsewhere.
+    """
+    started = time.perf_counter()
+    profile = profile or get_profile()
+    keyword_data = profile['categories']
+    index = profile['index']
+    document = as_document(document)
+    
+    # Find keywords in a single pass over the text
+    found_keywords = {category: [] for category in keyword_data}
+    keyword_hits = {category: {} for category in keyword_data}
+    
+    if keyword_matches is None:
+        keyword_matches = match_keywords(document.text, index, document.lower)
+    for keyword, offsets in keyword_matches.items():
+        pages = [document.page_at(offset) for offset in offsets]
+        for category, entry in index['keywords'][keyword]:
+            found_keywords[category].append(entry)
+            keyword_hits[category][entry] = {'count': len(offsets), 'offsets': offsets, 'pages': pages}
+    
+    # Calculate category scores
+    category_scores = {}
+    total_possible = 0
+    total_found = 0
+    
+    for category, keywords in keyword_data.items():
+        possible = len(keywords)
+        found = len(found_keywords[category])
+        total_possible += possible
+        total_found += found
+        category_scores[category] = round((found / possible) * 100, 1) if possible > 0 else 0
+    
+    # Overall ATS score
+    ats_score = round((total_found / total_possible) * 100, 1) if total_possible > 0 else 0
+    
+    keywords_done = time.perf_counter()
+    
+    # Extract contact information
+    contact_info = extract_contact_info(document)
+    contact_done = time.perf_counter()
+    
+    # Extract achievements
+    achievements = extract_achievements(document)
+    
+    if timings is not None:
+        timings['keywords'] = keywords_done - started
+        timings['contact'] = contact_done - keywords_done
+        timings['achievements'] = time.perf_counter() - contact_done
     
-    # Final score (including achievements)
-    final_score = round((ats_score * 0.7) + (contact_score * 2) + (length_score * 0.5) + (achievements['achievement_score']), 1)
+    contact_score = contact_points(contact_info)
+    word_count = len(document.words)
+    length_score = length_points(word_count)
     
     return {
-        'final_score': final_score,
+        'final_score': final_score(
+            profile['weights'], ats_score, contact_score, length_score, achievements['achievement_score']
+        ),
         'keyword_score': ats_score,
         'contact_score': contact_score,
         'length_score': length_score,
         'achievements': achievements,
         'category_scores': category_scores,
         'found_keywords': found_keywords,
+        'keyword_hits': keyword_hits,
         'keyword_counts': {
             'total': total_found,
-            'technical': len(found_keywords['technical_skills']),
-            'soft': len(found_keywords['soft_skills']),
-            'actions': len(found_keywords['action_verbs']),
-            'education': len(found_keywords['education_keywords']),
-            'certifications': len(found_keywords['certifications'])
+            'technical': len(found_keywords.get('technical_skills', [])),
+            'soft': len(found_keywords.get('soft_skills', [])),
+            'actions': len(found_keywords.get('action_verbs', [])),
+            'education': len(found_keywords.get('education_keywords', [])),
+            'certifications': len(found_keywords.get('certifications', []))
         },
         'contact_info': contact_info,
-        'word_count': word_count
+        'word_count': word_count,
+        'profile': {'name': profile['name'], 'version': profile['version']}
     }
 
 def get_score_rating(score):
@@ -442,81 +664,81 @@ def get_score_rating(score):
     else:
         return "Poor", "❌ Major Changes Needed"
 
-def generate_recommendations(analysis, text):
+# Recommendations that never change are built once and shared by every
+# analysis, so they must not be mutated
+RECOMMENDATIONS = {
+    'technical_skills': {
+        'category': 'Technical Skills',
+        'priority': 'High',
+        'message': 'Add more technical skills relevant to your target role.',
+        'examples': ['Python', 'Java', 'SQL', 'AWS', 'Docker', 'React']
+    },
+    'soft_skills': {
+        'category': 'Soft Skills',
+        'priority': 'Medium',
+        'message': 'Include soft skills that employers look for.',
+        'examples': ['Leadership', 'Communication', 'Problem Solving']
+    },
+    'action_verbs': {
+        'category': 'Action Verbs',
+        'priority': 'High',
+        'message': 'Use strong action verbs to describe your achievements.',
+        'examples': ['Developed', 'Managed', 'Implemented', 'Led', 'Achieved']
+    },
+    'email': {
+        'category': 'Contact Info',
+        'priority': 'Critical',
+        'message': 'Add your email address to your resume.',
+        'examples': ['your.name@email.com']
+    },
+    'phone': {
+        'category': 'Contact Info',
+        'priority': 'High',
+        'message': 'Include an Indian mobile number for recruiters.',
+        'examples': ['+91 98765 43210', '9876543210']
+    },
+    'linkedin': {
+        'category': 'Professional Links',
+        'priority': 'Medium',
+        'message': 'Add your LinkedIn profile URL or QR code.',
+        'examples': ['LinkedIn QR code with text "LinkedIn QR"']
+    },
+    'github': {
+        'category': 'Developer Links',
+        'priority': 'Medium',
+        'message': 'Add your GitHub profile URL or QR code.',
+        'examples': ['GitHub QR code with text "GitHub QR"']
+    },
+    'achievements': {
+        'category': 'Achievements',
+        'priority': 'Medium',
+        'message': 'Add your achievements to stand out!',
+        'examples': ['Secured 1st Rank in competition', 'Won coding challenge', 'Achieved 90%+ in exams']
+    }
+}
+
+def generate_recommendations(analysis, document):
     recommendations = []
-    found = analysis['found_keywords']
     counts = analysis['keyword_counts']
     contact = analysis['contact_info']
     achievements = analysis['achievements']
     
-    # Technical skills
+    # Keyword coverage
     if counts['technical'] < 5:
-        recommendations.append({
-            'category': 'Technical Skills',
-            'priority': 'High',
-            'message': 'Add more technical skills relevant to your target role.',
-            'examples': ['Python', 'Java', 'SQL', 'AWS', 'Docker', 'React']
-        })
-    
-    # Soft skills
+        recommendations.append(RECOMMENDATIONS['technical_skills'])
     if counts['soft'] < 3:
-        recommendations.append({
-            'category': 'Soft Skills',
-            'priority': 'Medium',
-            'message': 'Include soft skills that employers look for.',
-            'examples': ['Leadership', 'Communication', 'Problem Solving']
-        })
-    
-    # Action verbs
+        recommendations.append(RECOMMENDATIONS['soft_skills'])
     if counts['actions'] < 5:
-        recommendations.append({
-            'category': 'Action Verbs',
-            'priority': 'High',
-            'message': 'Use strong action verbs to describe your achievements.',
-            'examples': ['Developed', 'Managed', 'Implemented', 'Led', 'Achieved']
-        })
-    
-    # Contact info
-    if not contact['email']:
-        recommendations.append({
-            'category': 'Contact Info',
-            'priority': 'Critical',
-            'message': 'Add your email address to your resume.',
-            'examples': ['your.name@email.com']
-        })
-    
-    if not contact['phone']:
-        recommendations.append({
-            'category': 'Contact Info',
-            'priority': 'High',
-            'message': 'Include an Indian mobile number for recruiters.',
-            'examples': ['+91 98765 43210', '9876543210']
-        })
-    
-    if not contact['linkedin']:
-        recommendations.append({
-            'category': 'Professional Links',
-            'priority': 'Medium',
-            'message': 'Add your LinkedIn profile URL or QR code.',
-            'examples': ['LinkedIn QR code with text "LinkedIn QR"']
-        })
+        recommendations.append(RECOMMENDATIONS['action_verbs'])
     
-    if not contact['github']:
-        recommendations.append({
-            'category': 'Developer Links',
-            'priority': 'Medium',
-            'message': 'Add your GitHub profile URL or QR code.',
-            'examples': ['GitHub QR code with text "GitHub QR"']
-        })
+    # Contact info and links
+    for field in ('email', 'phone', 'linkedin', 'github'):
+        if not contact[field]:
+            recommendations.append(RECOMMENDATIONS[field])
     
     # Achievement recommendations
     if not achievements['has_achievements']:
-        recommendations.append({
-            'category': 'Achievements',
-            'priority': 'Medium',
-            'message': 'Add your achievements to stand out!',
-            'examples': ['Secured 1st Rank in competition', 'Won coding challenge', 'Achieved 90%+ in exams']
-        })
+        recommendations.append(RECOMMENDATIONS['achievements'])
     elif achievements['achievement_count'] < 3:
         recommendations.append({
             'category': 'Achievements',
@@ -527,10 +749,476 @@ def generate_recommendations(analysis, text):
     
     return recommendations[:7]
 
+def build_analysis(document, profile, timings=None, keyword_matches=None):
+    """Score extracted text (a Document or a string) and attach rating, recommendations and sample keywords"""
+    document = as_document(document)
+    analysis = calculate_ats_score(document, profile, timings, keyword_matches)
+    rating, description = get_score_rating(analysis['final_score'])
+    analysis['rating'] = rating
+    analysis['rating_description'] = description
+    analysis['recommendations'] = generate_recommendations(analysis, document)
+    analysis['sample_keywords'] = sample_keywords(profile)
+    return analysis
+
+# ============================================
+# RESPONSE ENCODING
+# ============================================
+# Analyses are encoded with one shared encoder without whitespace. The
+# compact format leaves out the per-hit detail (keyword offsets and pages,
+# contact match spans) and the sample keywords, which make up most of a full
+# payload; scores, found keywords and recommendations are unchanged.
+
+ANALYSIS_FORMATS = ('full', 'compact')
+_encoder = json.JSONEncoder(separators=(',', ':'))
+_sample_keywords = {}
+
+def sample_keywords(profile):
+    """The profile's sample keywords, built once per profile version and shared (do not mutate)"""
+    samples = _sample_keywords.get(profile['digest'])
+    if samples is None:
+        keyword_data = profile['categories']
+        samples = _sample_keywords[profile['digest']] = {
+            'technical_skills': keyword_data.get('technical_skills', [])[:10],
+            'soft_skills': keyword_data.get('soft_skills', [])[:8],
+            'action_verbs': keyword_data.get('action_verbs', [])[:10]
+        }
+    return samples
+
+def compact_analysis(analysis):
+    trimmed = {key: value for key, value in analysis.items() if key not in ('keyword_hits', 'sample_keywords')}
+    trimmed['contact_info'] = {key: value for key, value in analysis['contact_info'].items() if key != 'hits'}
+    return trimmed
+
+def encode_analysis(analysis, output_format='full'):
+    """Serialize an analysis dict (or its JSON payload) in the requested format"""
+    if output_format == 'full':
+        return analysis if isinstance(analysis, str) else _encoder.encode(analysis)
+    if isinstance(analysis, str):
+        analysis = json.loads(analysis)
+    return _encoder.encode(compact_analysis(analysis))
+
+def extract_document(data, filename):
+    """Extract the text of one upload given as bytes or a filesystem path.
+
+    Raises NoTextLayer without extracting when the probe finds no text.
+    """
+    check_text_layer(data, filename)
+    source = io.BytesIO(data) if isinstance(data, bytes) else data
+    if filename.lower().endswith('.pdf'):
+        return extract_text_from_pdf(source, MAX_PAGES, MAX_CHARS)
+    return extract_text_from_docx(source)
+
+def process_document(data, filename, text, profile_name):
+    """Extract (unless text is already known) and score one upload; runs in the extraction pool.
+
+    `data` is the upload's bytes or a filesystem path. Returns (text, analysis,
+    timings); analysis is None when too little text was extracted.
+    """
+    timings = {'extract': 0.0, 'score': 0.0}
+    if text is None:
+        started = time.perf_counter()
+        text = extract_document(data, filename)
+        timings['extract'] = time.perf_counter() - started
+    
+    if not text or len(text.strip()) < 50:
+        return text, None, timings
+    
+    started = time.perf_counter()
+    refresh_profiles()
+    profile = get_profile(profile_name)
+    analysis = build_analysis(text, profile, timings)
+    timings['score'] = time.perf_counter() - started
+    return text, analysis, timings
+
 @app.route('/')
 def index():
     return render_template('index.html')
 
+def extract_upload(data, filename, sign):
+    """Pool task: extract an upload's text, plus its MinHash signature when `sign` is set.
+
+    Returns (text, signature, extraction seconds).
+    """
+    started = time.perf_counter()
+    text = extract_document(data, filename)
+    seconds = time.perf_counter() - started
+    signature = minhash_signature(text) if sign and text else None
+    return text, signature, seconds
+
+def analysis_cache_key(digest, profile):
+    return f"{digest}-{profile['name']}-{profile['digest'][:16]}-{SCORING_VERSION}"
+
+def analysis_changes(previous, analysis):
+    """Score deltas by component and category, and keywords gained or lost, between two analyses"""
+    components = {
+        name: round(analysis[name] - previous[name], 1)
+        for name in ('keyword_score', 'contact_score', 'length_score')
+    }
+    components['achievement_score'] = (
+        analysis['achievements']['achievement_score'] - previous['achievements']['achievement_score']
+    )
+    added = {}
+    removed = {}
+    for category, entries in analysis['found_keywords'].items():
+        before = previous['found_keywords'].get(category, [])
+        gained = [entry for entry in entries if entry not in before]
+        lost = [entry for entry in before if entry not in entries]
+        if gained:
+            added[category] = gained
+        if lost:
+            removed[category] = lost
+    return {
+        'score_delta': round(analysis['final_score'] - previous['final_score'], 1),
+        'component_deltas': components,
+        'category_deltas': {
+            category: round(score - previous['category_scores'].get(category, 0), 1)
+            for category, score in analysis['category_scores'].items()
+        },
+        'keywords_added': added,
+        'keywords_removed': removed
+    }
+
+def document_text(digest, read_data, filename, sign=False):
+    """Return (text, signature) for an upload, from the text cache or the extraction pool.
+
+    The MinHash signature is only computed for freshly extracted text when
+    `sign` is set. Raises DocumentTimeout/DocumentRejected like run_document,
+    and NoTextLayer for uploads the probe rejected.
+    """
+    text_key = f"{digest}-{EXTRACTION_VERSION}"
+    text = text_cache.get(text_key)
+    metrics.inc('ats_cache_lookups_total', tier='text', result='miss' if text is None else 'hit')
+    if text is not None:
+        return text, None
+    
+    data = read_data()
+    kind = 'pdf' if filename.lower().endswith('.pdf') else 'docx'
+    try:
+        text, signature, extract_seconds = run_document(extract_upload, data, filename, sign)
+    except NoTextLayer as e:
+        metrics.observe('ats_stage_seconds', e.report['seconds'], stage='probe')
+        metrics.inc('ats_extraction_failures_total', reason=e.report['reason'])
+        metrics.inc('ats_bytes_rejected_total', len(data), kind=kind)
+        raise
+    text_cache.set(text_key, text)
+    metrics.observe('ats_stage_seconds', extract_seconds, stage=f'extract_{kind}')
+    metrics.inc('ats_bytes_processed_total', len(data))
+    metrics.inc('ats_documents_total', type=kind)
+    if kind == 'pdf' and text:
+        metrics.inc('ats_pages_processed_total', text.count('\f') + 1)
+    return text, signature
+
+def with_duplicate(analysis, duplicate, previous):
+    """Add a near-duplicate report to an analysis dict or JSON payload, with the changes since `previous` if cached"""
+    if duplicate is None:
+        return encode_analysis(analysis)
+    if isinstance(analysis, str):
+        analysis = json.loads(analysis)
+    analysis['duplicate_of'] = dict(duplicate, reused=False)
+    if previous is not None:
+        analysis['duplicate_of']['changes'] = analysis_changes(json.loads(previous), analysis)
+    return encode_analysis(analysis)
+
+def analyze_document(digest, read_data, filename, profile, dedupe=DEDUPE_MODE, submitter=None):
+    """Return (status_code, analysis JSON, error) for one upload, serving repeats from the cache.
+
+    `read_data` is only called when the text has to be extracted. Unless
+    `dedupe` is 'off', near-duplicates of the submitter's earlier uploads are
+    reported under 'duplicate_of'; in 'reuse' mode the earlier analysis is
+    returned instead of scoring the upload again, as long as it is still
+    cached. Anonymous uploads (no `submitter`) are only recorded. When the
+    probe rejects the upload, the probe report takes the place of the analysis.
+    """
+    analysis_key = analysis_cache_key(digest, profile)
+    cached = analysis_cache.get(analysis_key)
+    metrics.inc('ats_cache_lookups_total', tier='analysis', result='miss' if cached is None else 'hit')
+    if cached is not None:
+        if dedupe == 'off' or submitter is None:
+            return 200, cached, None
+        # Cached analyses never carry a duplicate report: it depends on who asks
+        duplicate = None
+        try:
+            duplicate = check_document(digest, filename, None, submitter=submitter)
+        except sqlite3.Error as e:
+            print(f"Dedupe index error: {e}")
+        previous = None if duplicate is None else analysis_cache.get(analysis_cache_key(duplicate['digest'], profile))
+        return 200, with_duplicate(cached, duplicate, previous), None
+    
+    try:
+        text, signature = document_text(digest, read_data, filename, sign=dedupe != 'off')
+        if not text or len(text.strip()) < 50:
+            metrics.inc('ats_extraction_failures_total', reason='no_text')
+            return 400, None, 'Could not extract enough text from file.'
+        
+        duplicate = None
+        previous = None
+        if dedupe != 'off':
+            try:
+                with metrics.time_stage('dedupe'):
+                    duplicate = check_document(digest, filename, text, signature, submitter)
+            except sqlite3.Error as e:
+                print(f"Dedupe index error: {e}")
+        if duplicate is not None:
+            metrics.inc('ats_duplicates_total', mode=dedupe)
+            previous = analysis_cache.get(analysis_cache_key(duplicate['digest'], profile))
+            if previous is not None and dedupe == 'reuse':
+                reused = json.loads(previous)
+                reused['duplicate_of'] = dict(duplicate, reused=True)
+                return 200, encode_analysis(reused), None
+        
+        _, analysis, timings = run_document(process_document, None, filename, text, profile['name'])
+    except NoTextLayer as e:
+        return 400, e.report, str(e)
+    except DocumentTimeout as e:
+        metrics.inc('ats_extraction_failures_total', reason='timeout')
+        return 504, None, f'Analysis timed out: {str(e)}'
+    except DocumentRejected as e:
+        metrics.inc('ats_extraction_failures_total', reason='rejected')
+        return 422, None, f'Could not process file: {str(e)}'
+    
+    for stage in ('keywords', 'contact', 'achievements', 'score'):
+        metrics.observe('ats_stage_seconds', timings[stage], stage=stage)
+    
+    with metrics.time_stage('serialize'):
+        payload = encode_analysis(analysis)
+    analysis_cache.set(analysis_key, payload)
+    
+    if SEARCH_INDEX:
+        try:
+            with metrics.time_stage('index'):
+                index_resume(digest, filename, profile['name'], analysis, text)
+        except sqlite3.Error as e:
+            print(f"Search index error: {e}")
+    return 200, payload if duplicate is None else with_duplicate(analysis, duplicate, previous), None
+
+def extract_texts(documents):
+    """Return (texts, errors) for a list of (filename, bytes) uploads, extracting in the pool.
+
+    Texts already in the text cache are reused; a document that fails or
+    yields too little text gets an error message instead of a text.
+    """
+    texts = [None] * len(documents)
+    errors = [None] * len(documents)
+    pending = []
+    for position, (filename, data) in enumerate(documents):
+        text_key = f"{hashlib.sha256(data).hexdigest()}-{EXTRACTION_VERSION}"
+        cached_text = text_cache.get(text_key)
+        metrics.inc('ats_cache_lookups_total', tier='text', result='miss' if cached_text is None else 'hit')
+        if cached_text is None:
+            pending.append((position, text_key))
+        else:
+            texts[position] = cached_text
+    
+    jobs = [(documents[position][1], documents[position][0]) for position, _ in pending]
+    for index, text, error in map_documents(extract_document, jobs):
+        position, text_key = pending[index]
+        if error is not None:
+            errors[position] = str(error)
+            continue
+        text_cache.set(text_key, text)
+        texts[position] = text
+    
+    for position, text in enumerate(texts):
+        if errors[position] is None and (not text or len(text.strip()) < 50):
+            errors[position] = 'Could not extract enough text from file.'
+            texts[position] = None
+    return texts, errors
+
+def score_sections(text, profile, previous=None):
+    """Score text section by section, reusing the keyword matches of sections unchanged since `previous`.
+
+    Keywords never span a line break, so the merged per-section matches equal
+    match_keywords() over the whole text; contact details and achievements are
+    cheap enough to recompute in full. Returns (analysis, section states,
+    titles of the sections that were matched again).
+    """
+    index = profile['index']
+    document = Document(text)
+    known = {section['digest']: section['matches'] for section in previous or ()}
+    states = []
+    rescored = []
+    matches = {}
+    for title, start, section_text in document.sections:
+        digest = hashlib.sha256(section_text.encode('utf-8')).hexdigest()
+        section_matches = known.get(digest)
+        if section_matches is None:
+            section_matches = match_keywords(section_text, index)
+            rescored.append(title)
+        states.append({'title': title, 'digest': digest, 'text': section_text, 'matches': section_matches})
+        for keyword, offsets in section_matches.items():
+            matches.setdefault(keyword, []).extend(start + offset for offset in offsets)
+    return build_analysis(document, profile, keyword_matches=matches), states, rescored
+
+def score_roles(text, profiles, top=None):
+    """Score text against several profiles at once; returns (profile-independent scores, ranked roles)"""
+    document = Document(text)
+    contact_info = extract_contact_info(document)
+    achievements = extract_achievements(document)
+    components = {
+        'contact_score': contact_points(contact_info),
+        'length_score': length_points(len(document.words)),
+        'achievement_score': achievements['achievement_score']
+    }
+    roles = rank_roles(document, profiles, top=top, **components)
+    return dict(components, word_count=len(document.words)), roles
+
+def replace_sections(states, replacements):
+    """Rebuild a session's text with the bodies (text after the heading line) of some sections replaced"""
+    titles = {state['title'] for state in states}
+    unknown = [title for title in replacements if title not in titles]
+    if unknown:
+        raise ValueError(f"Unknown section: {', '.join(unknown)}")
+    parts = []
+    for state in states:
+        body = replacements.get(state['title'])
+        if body is None:
+            parts.append(state['text'])
+            continue
+        heading = '' if state['title'] == PREAMBLE else state['text'].splitlines(keepends=True)[0]
+        parts.append(heading + body if body.endswith('\n') else heading + body + '\n')
+    return ''.join(parts)
+
+def session_response(session_id, analysis, states, output_format, status_code=200):
+    if output_format == 'compact':
+        analysis = compact_analysis(analysis)
+    body = dict(analysis, session_id=session_id, sections=[state['title'] for state in states])
+    response = jsonify(body)
+    response.headers.add('Access-Control-Allow-Origin', '*')
+    return response, status_code
+
+def probe_rejection(error, report):
+    """Error body for an upload without a text layer: message, reason code and probe statistics"""
+    return {'error': error, 'reason': report['reason'], 'probe': report}
+
+def analyze_upload(stream, filename, values, submitter=None):
+    """Handle one /analyze request: validate its options, then queue or analyze the upload.
+
+    `stream` is the uploaded file's UploadSpool (None without a file),
+    `values` the request's query and form values and `submitter` the id of
+    the caller's API key, if any (see submitter_id()). Shared by the Flask route
+    and the ASGI entry point; returns (status code, body), where body is the
+    analysis JSON on success and a dict otherwise.
+    """
+    output_format = values.get('format', 'full')
+    if output_format not in ANALYSIS_FORMATS:
+        return 400, {'error': 'format must be full or compact'}
+    
+    if stream is None:
+        return 400, {'error': 'No file uploaded'}
+    
+    if filename == '':
+        return 400, {'error': 'No file selected'}
+    
+    if not allowed_file(filename):
+        return 400, {'error': 'Please upload PDF or DOCX file'}
+    
+    refresh_profiles()
+    profile = get_profile(values.get('profile'))
+    if profile is None:
+        return 400, {'error': 'Unknown keyword profile'}
+    
+    dedupe = 'off' if DEDUPE_MODE == 'off' else values.get('dedupe', DEDUPE_MODE).lower()
+    if dedupe not in DEDUPE_MODES:
+        return 400, {'error': 'dedupe must be flag, reuse or off'}
+    
+    async_mode = values.get('async', '').lower() in ('1', 'true', 'yes')
+    callback_url = values.get('callback_url') or None
+    if callback_url and not callback_allowed(callback_url):
+        return 400, {'error': 'callback_url is not an allowed webhook destination'}
+    
+    try:
+        filename = secure_filename(filename)
+        with open_upload(stream) as buffer:
+            if async_mode:
+                job_id = submit_job(buffer.read(), filename, profile['name'], callback_url)
+                return 202, {'job_id': job_id, 'status': 'queued', 'status_url': f'/jobs/{job_id}'}
+            
+            with metrics.time_stage('upload'):
+                digest = content_digest(stream)
+            status_code, payload, error = analyze_document(
+                digest, buffer.read, filename, profile, dedupe, submitter
+            )
+        
+        if error is not None:
+            return status_code, {'error': error} if payload is None else probe_rejection(error, payload)
+        return 200, encode_analysis(payload, output_format)
+    
+    except Exception as e:
+        return 500, {'error': f'Analysis failed: {str(e)}'}
+
+def run_job(data, filename, profile_name):
+    """Job-queue handler: analyze a persisted upload"""
+    refresh_profiles()
+    profile = get_profile(profile_name)
+    if profile is None:
+        return 400, None, 'Unknown keyword profile'
+    digest = hashlib.sha256(data).hexdigest()
+    status_code, payload, error = analyze_document(digest, lambda: data, filename, profile)
+    # A probe report is not kept as the job result; its reason code is part of the error
+    return status_code, None if error is not None else payload, error
+
+@app.before_request
+def start_job_workers():
+    ensure_workers(run_job)
+
+# ============================================
+# ADMISSION CONTROL
+# ============================================
+# Requests that read and analyze uploads are admitted (see admission.py)
+# before their body is read; everything else is never held back. The slot is
+# released when the response has been sent, so a streamed batch keeps it
+# until its last line.
+ADMITTED_ENDPOINTS = {'analyze', 'analyze_batch', 'match', 'analyze_roles', 'start_session', 'update_session'}
+
+def shed_response(error):
+    metrics.inc('ats_requests_shed_total', reason=error.reason)
+    response = jsonify({'error': str(error), 'retry_after': error.retry_after})
+    response.headers.add('Access-Control-Allow-Origin', '*')
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response, error.status
+
+@app.before_request
+def admit_request():
+    g.admission_ticket = None
+    if not ADMISSION_ENABLED or request.method != 'POST' or request.endpoint not in ADMITTED_ENDPOINTS:
+        return None
+    client = client_key(request.remote_addr, request.headers.get('X-Forwarded-For'), request.headers.get('X-API-Key'))
+    try:
+        g.admission_ticket = admit(request_lane(request.content_length), client)
+    except Shed as e:
+        return shed_response(e)
+    metrics.observe('ats_stage_seconds', g.admission_ticket.waited, stage='admission')
+    return None
+
+@app.after_request
+def count_request(response):
+    metrics.inc('ats_requests_total', endpoint=request.endpoint or 'unknown', status=str(response.status_code))
+    if startup['first_response_seconds'] is None:
+        startup['first_response_seconds'] = round(time.perf_counter() - BOOT_STARTED, 4)
+    ticket = g.pop('admission_ticket', None)
+    if ticket is not None:
+        response.call_on_close(lambda: release(ticket))
+    return response
+
+@app.teardown_request
+def release_admission(error=None):
+    # Requests that failed before a response was made still hold their slot
+    ticket = g.pop('admission_ticket', None)
+    if ticket is not None:
+        release(ticket)
+
+@app.errorhandler(RequestEntityTooLarge)
+@app.errorhandler(UnsupportedMediaType)
+def upload_rejected(e):
+    metrics.inc('ats_uploads_rejected_total', reason='size' if e.code == 413 else 'type')
+    response = jsonify({'error': e.description})
+    response.headers.add('Access-Control-Allow-Origin', '*')
+    return response, e.code
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/analyze', methods=['POST', 'OPTIONS'])
 def analyze():
     if request.method == 'OPTIONS':
@@ -540,52 +1228,402 @@ def analyze():
         response.headers.add('Access-Control-Allow-Methods', 'POST, OPTIONS')
         return response
 
+    file = request.files.get('resume')
+    submitter = submitter_id(request.headers.get('X-API-Key'))
+    if file is None:
+        status_code, body = analyze_upload(None, None, request.values, submitter)
+    else:
+        status_code, body = analyze_upload(file.stream, file.filename, request.values, submitter)
+    response = Response(body, mimetype='application/json') if isinstance(body, str) else jsonify(body)
+    response.headers.add('Access-Control-Allow-Origin', '*')
+    return response, status_code
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    output_format = request.args.get('format', 'full')
+    if output_format not in ANALYSIS_FORMATS:
+        return jsonify({'error': 'format must be full or compact'}), 400
+    
+    job = get_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    body = {
+        'job_id': job['id'],
+        'status': job['status'],
+        'filename': job['filename'],
+        'profile': job['profile'],
+        'attempts': job['attempts'],
+        'created': job['created'],
+        'started': job['started'],
+        'finished': job['finished']
+    }
+    if job['result'] is not None:
+        body['result'] = json.loads(job['result'])
+        if output_format == 'compact':
+            body['result'] = compact_analysis(body['result'])
+    if job['error'] is not None:
+        body['error'] = job['error']
+        body['status_code'] = job['status_code']
+    response = jsonify(body)
+    response.headers.add('Access-Control-Allow-Origin', '*')
+    return response
+
+def batch_documents():
+    """Collect (filename, bytes) for the 'resumes' files and zip 'archive' uploads of a request"""
+    documents = []
+    for upload in request.files.getlist('resumes') + request.files.getlist('archive'):
+        filename = secure_filename(upload.filename or '')
+        if filename.lower().endswith('.zip'):
+            documents.extend(documents_from_zip(upload.stream, BATCH_MAX_FILES - len(documents)))
+        elif allowed_file(filename):
+            documents.append((filename, upload.read()))
+        if len(documents) > BATCH_MAX_FILES:
+            raise ValueError(f'Batch contains more than {BATCH_MAX_FILES} documents')
+    return documents
+
+@app.route('/analyze/batch', methods=['POST'])
+def analyze_batch():
+    """Score many resumes (multipart 'resumes' files and/or zip archives) and stream one result per line"""
+    output_format = request.args.get('format', 'ndjson')
+    if output_format not in ('ndjson', 'csv'):
+        return jsonify({'error': 'format must be ndjson or csv'}), 400
+    
+    refresh_profiles()
+    profile = get_profile(request.values.get('profile'))
+    if profile is None:
+        return jsonify({'error': 'Unknown keyword profile'}), 400
+    
+    try:
+        documents = batch_documents()
+    except (ValueError, zipfile.BadZipFile) as e:
+        return jsonify({'error': f'Invalid batch: {str(e)}'}), 400
+    
+    if not documents:
+        return jsonify({'error': 'No PDF or DOCX files found in upload'}), 400
+    
+    rows = iter_batch(documents, process_document, profile['name'])
+    if output_format == 'csv':
+        response = Response(csv_lines(rows), mimetype='text/csv')
+    else:
+        response = Response(ndjson_lines(rows), mimetype='application/x-ndjson')
+    response.headers.add('Access-Control-Allow-Origin', '*')
+    return response
+
+@app.route('/match', methods=['POST'])
+def match():
+    """Rank uploaded resumes against one or more job descriptions ('job_description' form fields)"""
+    jobs = [text for text in request.form.getlist('job_description') if text.strip()]
+    if not jobs:
+        return jsonify({'error': 'No job description provided'}), 400
+    if len(jobs) > MATCH_MAX_JOBS:
+        return jsonify({'error': f'At most {MATCH_MAX_JOBS} job descriptions per request'}), 400
+    
+    try:
+        top = int(request.args.get('top', MATCH_TOP))
+    except ValueError:
+        return jsonify({'error': 'top must be an integer'}), 400
+    
+    refresh_profiles()
+    profile = get_profile(request.values.get('profile'))
+    if profile is None:
+        return jsonify({'error': 'Unknown keyword profile'}), 400
+    
+    try:
+        documents = batch_documents()
+    except (ValueError, zipfile.BadZipFile) as e:
+        return jsonify({'error': f'Invalid batch: {str(e)}'}), 400
+    
+    if not documents:
+        return jsonify({'error': 'No PDF or DOCX files found in upload'}), 400
+    
+    try:
+        texts, errors = extract_texts(documents)
+        ranked = [position for position, text in enumerate(texts) if text is not None]
+        with metrics.time_stage('match'):
+            results = rank_resumes([texts[position] for position in ranked], jobs, profile, top)
+    except Exception as e:
+        return jsonify({'error': f'Matching failed: {str(e)}'}), 500
+    
+    for result in results:
+        for entry in result['matches']:
+            entry['resume'] = ranked[entry['resume']]
+            entry['filename'] = documents[entry['resume']][0]
+    
+    response = jsonify({
+        'profile': {'name': profile['name'], 'version': profile['version']},
+        'jobs': results,
+        'errors': [
+            {'resume': position, 'filename': documents[position][0], 'error': error}
+            for position, error in enumerate(errors) if error is not None
+        ]
+    })
+    response.headers.add('Access-Control-Allow-Origin', '*')
+    return response
+
+@app.route('/analyze/roles', methods=['POST'])
+def analyze_roles():
+    """Score one upload against several keyword profiles ('profiles', comma-separated; default all) and rank them"""
+    try:
+        top = int(request.args.get('top', ROLES_TOP))
+    except ValueError:
+        return jsonify({'error': 'top must be an integer'}), 400
+    
     if 'resume' not in request.files:
         return jsonify({'error': 'No file uploaded'}), 400
     
     file = request.files['resume']
+    if not allowed_file(file.filename):
+        return jsonify({'error': 'Please upload PDF or DOCX file'}), 400
+    
+    refresh_profiles()
+    names = list(dict.fromkeys(name.strip() for name in request.values.get('profiles', '').split(',') if name.strip()))
+    if names:
+        profiles = [get_profile(name) for name in names]
+        unknown = [name for name, profile in zip(names, profiles) if profile is None]
+        if unknown:
+            return jsonify({'error': f"Unknown keyword profile: {', '.join(unknown)}"}), 400
+    else:
+        profiles = get_profiles()
+    if not profiles:
+        return jsonify({'error': 'No keyword profiles loaded'}), 400
+    
+    try:
+        filename = secure_filename(file.filename)
+        with open_upload(file.stream) as buffer:
+            digest = content_digest(file.stream)
+            text, _ = document_text(digest, buffer.read, filename)
+    except NoTextLayer as e:
+        return jsonify(probe_rejection(str(e), e.report)), 400
+    except DocumentTimeout as e:
+        return jsonify({'error': f'Analysis timed out: {str(e)}'}), 504
+    except DocumentRejected as e:
+        return jsonify({'error': f'Could not process file: {str(e)}'}), 422
+    
+    if not text or len(text.strip()) < 50:
+        return jsonify({'error': 'Could not extract enough text from file.'}), 400
     
-    if file.filename == '':
-        return jsonify({'error': 'No file selected'}), 400
+    with metrics.time_stage('roles'):
+        scores, roles = score_roles(text, profiles, top)
+    response = jsonify(dict(scores, profiles_scored=len(profiles), roles=roles))
+    response.headers.add('Access-Control-Allow-Origin', '*')
+    return response
+
+@app.route('/profiles', methods=['GET'])
+def profiles():
+    refresh_profiles()
+    return jsonify({'profiles': list_profiles()})
+
+@app.route('/search', methods=['GET'])
+def search_resumes():
+    """Query the index of analyzed resumes; the results include candidate data, so the admin token is required"""
+    token = app.config['ADMIN_TOKEN']
+    if not token or request.headers.get('X-Admin-Token') != token:
+        return jsonify({'error': 'Forbidden'}), 403
+    
+    args = request.args
+    try:
+        flags = {flag: args[flag].lower() in ('1', 'true', 'yes') for flag in FLAG_COLUMNS if flag in args}
+        results = search(
+            query=args.get('q') or None,
+            keywords=args.getlist('keyword'),
+            category=args.get('category') or None,
+            profile=args.get('profile') or None,
+            min_score=float(args['min_score']) if args.get('min_score') else None,
+            max_score=float(args['max_score']) if args.get('max_score') else None,
+            flags=flags,
+            sort=args.get('sort', 'score'),
+            page=int(args.get('page', 1)),
+            per_page=int(args.get('per_page', 20))
+        )
+    except ValueError as e:
+        return jsonify({'error': f'Invalid search: {str(e)}'}), 400
+    except sqlite3.Error as e:
+        return jsonify({'error': f'Search failed: {str(e)}'}), 500
+    return jsonify(results)
+
+@app.route('/duplicates', methods=['GET'])
+def duplicates():
+    """Uploads that have near-duplicates, with their copies; requires the admin token"""
+    token = app.config['ADMIN_TOKEN']
+    if not token or request.headers.get('X-Admin-Token') != token:
+        return jsonify({'error': 'Forbidden'}), 403
+    
+    try:
+        page = int(request.args.get('page', 1))
+        per_page = int(request.args.get('per_page', 20))
+        if page < 1 or not 1 <= per_page <= 100:
+            raise ValueError('page must be positive and per_page between 1 and 100')
+    except ValueError as e:
+        return jsonify({'error': f'Invalid request: {str(e)}'}), 400
     
+    try:
+        groups = duplicate_groups(page, per_page)
+    except sqlite3.Error as e:
+        return jsonify({'error': f'Duplicate lookup failed: {str(e)}'}), 500
+    return jsonify({'page': page, 'per_page': per_page, 'groups': groups})
+
+@app.route('/sessions', methods=['POST'])
+def start_session():
+    """Analyze an upload and keep its sections so edited versions can be re-scored incrementally"""
+    output_format = request.args.get('format', 'full')
+    if output_format not in ANALYSIS_FORMATS:
+        return jsonify({'error': 'format must be full or compact'}), 400
+    
+    if 'resume' not in request.files:
+        return jsonify({'error': 'No file uploaded'}), 400
+    
+    file = request.files['resume']
     if not allowed_file(file.filename):
         return jsonify({'error': 'Please upload PDF or DOCX file'}), 400
     
+    refresh_profiles()
+    profile = get_profile(request.values.get('profile'))
+    if profile is None:
+        return jsonify({'error': 'Unknown keyword profile'}), 400
+    
     try:
         filename = secure_filename(file.filename)
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        safe_filename = f"{timestamp}_{filename}"
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], safe_filename)
-        os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-        file.save(filepath)
-        
-        if filename.endswith('.pdf'):
-            text = extract_text_from_pdf(filepath)
+        with open_upload(file.stream) as buffer:
+            digest = content_digest(file.stream)
+            text, _ = document_text(digest, buffer.read, filename)
+    except NoTextLayer as e:
+        return jsonify(probe_rejection(str(e), e.report)), 400
+    except DocumentTimeout as e:
+        return jsonify({'error': f'Analysis timed out: {str(e)}'}), 504
+    except DocumentRejected as e:
+        return jsonify({'error': f'Could not process file: {str(e)}'}), 422
+    
+    if not text or len(text.strip()) < 50:
+        return jsonify({'error': 'Could not extract enough text from file.'}), 400
+    
+    try:
+        with metrics.time_stage('session'):
+            analysis, states, _ = score_sections(text, profile)
+            session_id = create_session(profile['name'], {
+                'profile_digest': profile['digest'], 'sections': states, 'analysis': analysis
+            })
+    except sqlite3.Error as e:
+        return jsonify({'error': f'Session storage failed: {str(e)}'}), 500
+    return session_response(session_id, analysis, states, output_format, 201)
+
+@app.route('/sessions/<session_id>', methods=['POST', 'DELETE'])
+def update_session(session_id):
+    """Re-score a session with a new upload, JSON {"text": ...} or JSON {"sections": {title: body}}"""
+    output_format = request.args.get('format', 'full')
+    if output_format not in ANALYSIS_FORMATS:
+        return jsonify({'error': 'format must be full or compact'}), 400
+    
+    if request.method == 'DELETE':
+        if not delete_session(session_id):
+            return jsonify({'error': 'Session not found'}), 404
+        return jsonify({'status': 'deleted'})
+    
+    session = load_session(session_id)
+    if session is None:
+        return jsonify({'error': 'Session not found or expired'}), 404
+    
+    refresh_profiles()
+    profile = get_profile(session['profile'])
+    if profile is None:
+        return jsonify({'error': 'Unknown keyword profile'}), 400
+    state = session['state']
+    # Matches made against an older version of the profile cannot be reused
+    previous = state['sections'] if state['profile_digest'] == profile['digest'] else None
+    
+    try:
+        if 'resume' in request.files:
+            file = request.files['resume']
+            if not allowed_file(file.filename):
+                return jsonify({'error': 'Please upload PDF or DOCX file'}), 400
+            filename = secure_filename(file.filename)
+            with open_upload(file.stream) as buffer:
+                digest = content_digest(file.stream)
+                text, _ = document_text(digest, buffer.read, filename)
         else:
-            text = extract_text_from_docx(filepath)
-        
-        os.remove(filepath)
-        
-        if not text or len(text.strip()) < 50:
-            return jsonify({'error': 'Could not extract enough text from file.'}), 400
-        
-        analysis = calculate_ats_score(text)
-        rating, description = get_score_rating(analysis['final_score'])
-        analysis['rating'] = rating
-        analysis['rating_description'] = description
-        analysis['recommendations'] = generate_recommendations(analysis, text)
-        analysis['sample_keywords'] = {
-            'technical_skills': ATS_DATA['technical_skills'][:10],
-            'soft_skills': ATS_DATA['soft_skills'][:8],
-            'action_verbs': ATS_DATA['action_verbs'][:10]
-        }
-        
-        response = jsonify(analysis)
-        response.headers.add('Access-Control-Allow-Origin', '*')
-        return response
+            body = request.get_json(silent=True) or {}
+            if isinstance(body.get('text'), str):
+                text = body['text'][:MAX_CHARS]
+            elif isinstance(body.get('sections'), dict):
+                text = replace_sections(state['sections'], body['sections'])[:MAX_CHARS]
+            else:
+                return jsonify({'error': 'Send a resume file, "text" or "sections"'}), 400
+    except ValueError as e:
+        return jsonify({'error': f'Invalid update: {str(e)}'}), 400
+    except NoTextLayer as e:
+        return jsonify(probe_rejection(str(e), e.report)), 400
+    except DocumentTimeout as e:
+        return jsonify({'error': f'Analysis timed out: {str(e)}'}), 504
+    except DocumentRejected as e:
+        return jsonify({'error': f'Could not process file: {str(e)}'}), 422
     
-    except Exception as e:
-        return jsonify({'error': f'Analysis failed: {str(e)}'}), 500
+    if not text or len(text.strip()) < 50:
+        return jsonify({'error': 'Could not extract enough text from file.'}), 400
+    
+    try:
+        with metrics.time_stage('session'):
+            analysis, states, rescored = score_sections(text, profile, previous)
+            changes = analysis_changes(state['analysis'], analysis)
+            save_session(session_id, {'profile_digest': profile['digest'], 'sections': states, 'analysis': analysis})
+    except sqlite3.Error as e:
+        return jsonify({'error': f'Session storage failed: {str(e)}'}), 500
+    changes['rescored_sections'] = rescored
+    analysis['changes'] = changes
+    return session_response(session_id, analysis, states, output_format)
+
+@app.route('/admin/reload', methods=['POST'])
+def admin_reload():
+    token = app.config['ADMIN_TOKEN']
+    if not token or request.headers.get('X-Admin-Token') != token:
+        return jsonify({'error': 'Forbidden'}), 403
+    
+    try:
+        request_reload()
+    except OSError as e:
+        return jsonify({'error': f'Reload failed: {str(e)}'}), 500
+    return jsonify({'status': 'reloaded', 'profiles': list_profiles()})
+
+ATS_CHECKLIST = {
+    'message': "🔍 Amazon ATS (Applicant Tracking System) Test",
+    'tips': [
+        {
+            'title': 'Formatting Tips',
+            'items': [
+                'Use standard fonts (Arial, Calibri, Times New Roman)',
+                'Save as PDF or DOCX (not JPEG or PNG)',
+                'Avoid headers, footers, tables, and columns',
+                'Use bullet points for easy scanning'
+            ]
+        },
+        {
+            'title': 'Content Tips',
+            'items': [
+                'Include job-specific keywords from description',
+                'Quantify achievements with numbers and percentages',
+                'Use both technical skills and soft skills',
+                'Add complete contact information with Indian mobile number'
+            ]
+        },
+        {
+            'title': 'Achievement Tips',
+            'items': [
+                'Add your achievements in a dedicated section',
+                'Include awards, ranks, and competition wins',
+                'Quantify your achievements with numbers',
+                'Example: "Secured 1st Rank in typing competition"'
+            ]
+        },
+        {
+            'title': 'QR Code Tips',
+            'items': [
+                'Add QR codes for LinkedIn and GitHub',
+                'Write simple text like "LinkedIn QR" and "GitHub QR" near the codes',
+                'The system will detect them automatically',
+                'QR codes make your resume stand out!'
+            ]
+        }
+    ]
+}
 
 @app.route('/check_ats', methods=['GET', 'OPTIONS'])
 def check_ats():
@@ -596,51 +1634,15 @@ def check_ats():
         response.headers.add('Access-Control-Allow-Methods', 'GET, OPTIONS')
         return response
 
-    response = jsonify({
-        'message': "🔍 Amazon ATS (Applicant Tracking System) Test",
-        'tips': [
-            {
-                'title': 'Formatting Tips',
-                'items': [
-                    'Use standard fonts (Arial, Calibri, Times New Roman)',
-                    'Save as PDF or DOCX (not JPEG or PNG)',
-                    'Avoid headers, footers, tables, and columns',
-                    'Use bullet points for easy scanning'
-                ]
-            },
-            {
-                'title': 'Content Tips',
-                'items': [
-                    'Include job-specific keywords from description',
-                    'Quantify achievements with numbers and percentages',
-                    'Use both technical skills and soft skills',
-                    'Add complete contact information with Indian mobile number'
-                ]
-            },
-            {
-                'title': 'Achievement Tips',
-                'items': [
-                    'Add your achievements in a dedicated section',
-                    'Include awards, ranks, and competition wins',
-                    'Quantify your achievements with numbers',
-                    'Example: "Secured 1st Rank in typing competition"'
-                ]
-            },
-            {
-                'title': 'QR Code Tips',
-                'items': [
-                    'Add QR codes for LinkedIn and GitHub',
-                    'Write simple text like "LinkedIn QR" and "GitHub QR" near the codes',
-                    'The system will detect them automatically',
-                    'QR codes make your resume stand out!'
-                ]
-            }
-        ]
-    })
+    response = jsonify(ATS_CHECKLIST)
     
     response.headers.add('Access-Control-Allow-Origin', '*')
     return response
 
+startup['ready_seconds'] = round(time.perf_counter() - BOOT_STARTED, 4)
+print(f"Startup: imports {startup['imports_seconds']:.3f}s, ready {startup['ready_seconds']:.3f}s "
+      f"({profile_load_stats()['compiled']} of {len(list_profiles())} keyword profiles compiled)")
+
 if __name__ == '__main__':
     print("🚀 ATS Resume Analyzer Starting...")
     print("📱 Indian Mobile Number Support Enabled")
@@ -648,7 +1650,7 @@ if __name__ == '__main__':
     print("🏆 Achievement Scanning Enabled")
     print("🐙 GitHub QR Detection with simple text")
     print("🔗 LinkedIn QR Detection with simple text")
-    print(f"📁 Upload folder: {app.config['UPLOAD_FOLDER']}")
+    print(f"📁 Uploads spool to disk above {SPOOL_THRESHOLD // (1024 * 1024)}MB")
     print("✨ Ready to analyze resumes!")
     
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
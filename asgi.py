@@ -0,0 +1,322 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl
+
+from werkzeug.exceptions import HTTPException, RequestEntityTooLarge
+from werkzeug.http import parse_options_header
+from werkzeug.sansio.multipart import Data, Epilogue, Field, File, MultipartDecoder, NeedData
+
+import metrics
+from admission import (
+    ADMISSION_ENABLED, Shed, admit_async, client_key, release, request_lane, submitter_id, take_token
+)
+from app import (
+    ATS_CHECKLIST, BOOT_STARTED, SPOOL_THRESHOLD, UploadSpool, analyze_upload, app, health_status, run_job, startup
+)
+from jobs import ensure_workers
+
+# ============================================
+# ASGI ENTRY POINT
+# ============================================
+# `uvicorn asgi:application` (or gunicorn with uvicorn's worker class) serves
+# the app without tying a worker process to each connection. /analyze uploads
+# are received on the event loop and decoded as they arrive, with the same
+# streaming checks as the Flask app; the analysis then runs on a small thread
+# pool whose threads mostly wait on the extraction process pool. /health and
+# /check_ats are answered directly. Any other request is handed to the Flask
+# app once its whole body has been received, so slow clients never hold a thread.
+
+ASGI_THREADS = int(os.environ.get('ATS_ASGI_THREADS', '8'))
+# Body chunks are fed to the multipart decoder in slices of at most this size
+CHUNK_SIZE = 64 * 1024
+# Same limits as Flask's form parser for non-file fields
+FORM_MEMORY = 500_000
+FORM_PARTS = 1000
+
+_executor = ThreadPoolExecutor(max_workers=ASGI_THREADS, thread_name_prefix='ats-asgi')
+_checklist_body = json.dumps(ATS_CHECKLIST).encode('utf-8')
+
+PREFLIGHT_METHODS = {'/analyze': b'POST, OPTIONS', '/check_ats': b'GET, OPTIONS'}
+
+class ClientDisconnected(Exception):
+    pass
+
+async def _respond(send, status, body, endpoint, headers=()):
+    if not isinstance(body, bytes):
+        body = (body if isinstance(body, str) else json.dumps(body)).encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode('latin-1')),
+            (b'access-control-allow-origin', b'*'),
+            *headers
+        ]
+    })
+    await send({'type': 'http.response.body', 'body': body})
+    metrics.inc('ats_requests_total', endpoint=endpoint, status=str(status))
+    if startup['first_response_seconds'] is None:
+        startup['first_response_seconds'] = round(time.perf_counter() - BOOT_STARTED, 4)
+
+async def _body_chunks(receive):
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            raise ClientDisconnected()
+        body = message.get('body', b'')
+        for start in range(0, len(body), CHUNK_SIZE):
+            yield body[start:start + CHUNK_SIZE]
+        if not message.get('more_body', False):
+            return
+
+def _header(scope, name):
+    for key, value in scope['headers']:
+        if key == name:
+            return value.decode('latin-1')
+    return None
+
+def _too_large(scope):
+    length = _header(scope, b'content-length')
+    return length is not None and length.isdigit() and int(length) > app.config['MAX_CONTENT_LENGTH']
+
+class FormReader:
+    """Incremental multipart/form-data decoder keeping the form fields and the 'resume' upload.
+
+    Every file part is written to an UploadSpool, so type and size are
+    checked while the body arrives; only the first 'resume' file is kept.
+    """
+    def __init__(self, boundary):
+        self.decoder = MultipartDecoder(boundary, FORM_MEMORY, max_parts=FORM_PARTS)
+        self.values = {}
+        self.upload = None
+        self.filename = None
+        self._part = None
+        self._target = None
+        self._field_size = 0
+
+    def feed(self, data):
+        """Decode the next body chunk (None at the end of the body)"""
+        self.decoder.receive_data(data)
+        event = self.decoder.next_event()
+        while not isinstance(event, (Epilogue, NeedData)):
+            if isinstance(event, Field):
+                self._part = event
+                self._target = []
+                self._field_size = 0
+            elif isinstance(event, File):
+                self._part = event
+                self._target = UploadSpool(event.filename)
+                if event.name == 'resume' and self.upload is None:
+                    self.upload = self._target
+                    self.filename = event.filename
+            elif isinstance(event, Data):
+                if isinstance(self._part, Field):
+                    self._field_size += len(event.data)
+                    if self._field_size > FORM_MEMORY:
+                        raise RequestEntityTooLarge()
+                    self._target.append(event.data)
+                    if not event.more_data:
+                        value = b''.join(self._target).decode('utf-8', 'replace')
+                        self.values.setdefault(self._part.name, value)
+                else:
+                    self._target.write(event.data)
+                    if not event.more_data:
+                        self._target.seek(0)
+                        if self._target is not self.upload:
+                            self._target.close()
+            event = self.decoder.next_event()
+
+    def discard(self):
+        for spool in (self._target, self.upload):
+            if spool is not None and not isinstance(spool, list):
+                spool.close()
+
+async def _read_form(scope, receive):
+    """Receive an /analyze body; return (form values, 'resume' UploadSpool or None, its filename)"""
+    content_type, options = parse_options_header(_header(scope, b'content-type'))
+    if content_type != 'multipart/form-data' or not options.get('boundary'):
+        return {}, None, None
+    reader = FormReader(options['boundary'].encode('latin-1'))
+    try:
+        async for chunk in _body_chunks(receive):
+            reader.feed(chunk)
+        reader.feed(None)
+    except BaseException:
+        reader.discard()
+        raise
+    return reader.values, reader.upload, reader.filename
+
+async def _shed(send, error):
+    metrics.inc('ats_requests_shed_total', reason=error.reason)
+    await _respond(send, error.status, {'error': str(error), 'retry_after': error.retry_after}, 'analyze', headers=[
+        (b'retry-after', str(error.retry_after).encode('latin-1'))
+    ])
+
+async def _analyze(scope, receive, send):
+    ensure_workers(run_job)
+    # The client's rate limit is checked before the body is read; a slot is
+    # only taken once it has arrived, so slow uploads do not hold one
+    if ADMISSION_ENABLED and not _too_large(scope):
+        client = client_key(
+            (scope.get('client') or ('', 0))[0], _header(scope, b'x-forwarded-for'), _header(scope, b'x-api-key')
+        )
+        try:
+            take_token(client)
+        except Shed as e:
+            await _shed(send, e)
+            return
+    try:
+        if _too_large(scope):
+            raise RequestEntityTooLarge()
+        values, upload, filename = await _read_form(scope, receive)
+    except ClientDisconnected:
+        return
+    except HTTPException as e:
+        if e.code in (413, 415):
+            metrics.inc('ats_uploads_rejected_total', reason='size' if e.code == 413 else 'type')
+        await _respond(send, e.code, {'error': e.description}, 'analyze')
+        return
+    except ValueError as e:
+        await _respond(send, 400, {'error': f'Invalid multipart body: {str(e)}'}, 'analyze')
+        return
+
+    # Query parameters take precedence over form fields, as in Flask's request.values
+    query = {}
+    for key, value in parse_qsl(scope['query_string'].decode('latin-1'), keep_blank_values=True):
+        query.setdefault(key, value)
+    values.update(query)
+    ticket = None
+    try:
+        if ADMISSION_ENABLED:
+            try:
+                ticket = await admit_async(request_lane(upload.received if upload is not None else 0))
+            except Shed as e:
+                await _shed(send, e)
+                return
+            metrics.observe('ats_stage_seconds', ticket.waited, stage='admission')
+        loop = asyncio.get_running_loop()
+        submitter = submitter_id(_header(scope, b'x-api-key'))
+        status_code, body = await loop.run_in_executor(
+            _executor, analyze_upload, upload, filename, values, submitter
+        )
+    finally:
+        if ticket is not None:
+            release(ticket)
+        if upload is not None:
+            upload.close()
+    await _respond(send, status_code, body, 'analyze')
+
+def _environ(scope, body, size):
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'CONTENT_LENGTH': str(size),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False
+    }
+    for name, value in scope['headers']:
+        key = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if key == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+        elif key != 'CONTENT_LENGTH':
+            key = f'HTTP_{key}'
+            environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+async def _wsgi(scope, receive, send):
+    """Run a request through the Flask app once its body has been received"""
+    if _too_large(scope):
+        await _respond(send, 413, {'error': 'Request body too large'}, 'unknown')
+        return
+
+    body = tempfile.SpooledTemporaryFile(max_size=SPOOL_THRESHOLD)
+    result = None
+    try:
+        size = 0
+        async for chunk in _body_chunks(receive):
+            size += len(chunk)
+            if size > app.config['MAX_CONTENT_LENGTH']:
+                await _respond(send, 413, {'error': 'Request body too large'}, 'unknown')
+                return
+            body.write(chunk)
+        body.seek(0)
+
+        started = {}
+        def start_response(status, headers, exc_info=None):
+            started['status'] = int(status.split(' ', 1)[0])
+            started['headers'] = [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers]
+
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(_executor, app, _environ(scope, body, size), start_response)
+        chunks = iter(result)
+        done = object()
+        chunk = await loop.run_in_executor(_executor, next, chunks, done)
+        await send({'type': 'http.response.start', 'status': started['status'], 'headers': started['headers']})
+        # Streaming responses (batch results) are forwarded chunk by chunk
+        while chunk is not done:
+            if chunk:
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            chunk = await loop.run_in_executor(_executor, next, chunks, done)
+        await send({'type': 'http.response.body', 'body': b''})
+    except ClientDisconnected:
+        return
+    finally:
+        if result is not None and hasattr(result, 'close'):
+            result.close()
+        body.close()
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            ensure_workers(run_job)
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            _executor.shutdown(wait=False)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await _lifespan(receive, send)
+        return
+    if scope['type'] != 'http':
+        return
+
+    path = scope['path']
+    method = scope['method']
+    if method == 'OPTIONS' and path in PREFLIGHT_METHODS:
+        await _respond(send, 200, {'status': 'ok'}, path.strip('/'), headers=[
+            (b'access-control-allow-headers', b'Content-Type, Accept'),
+            (b'access-control-allow-methods', PREFLIGHT_METHODS[path]),
+            (b'access-control-max-age', b'3600')
+        ])
+    elif path == '/analyze' and method == 'POST':
+        await _analyze(scope, receive, send)
+    elif path == '/health' and method == 'GET':
+        status = await asyncio.get_running_loop().run_in_executor(_executor, health_status)
+        await _respond(send, 200, status, 'health')
+    elif path == '/check_ats' and method == 'GET':
+        await _respond(send, 200, _checklist_body, 'check_ats')
+    else:
+        await _wsgi(scope, receive, send)
@@ -0,0 +1,190 @@
+import os
+import io
+import csv
+import sys
+import json
+import time
+import zipfile
+import argparse
+
+import engine
+
+# ============================================
+# BATCH ANALYSIS
+# ============================================
+# Shared by the /analyze/batch endpoint and the command line. Documents are
+# scored in the extraction pool and emitted as soon as each one finishes;
+# a summary with throughput and per-stage timings closes the stream.
+
+BATCH_MAX_FILES = int(os.environ.get('ATS_BATCH_MAX_FILES', '1000'))
+BATCH_EXTENSIONS = ('.pdf', '.docx')
+
+CSV_FIELDS = [
+    'filename', 'status', 'error', 'final_score', 'rating', 'keyword_score',
+    'contact_score', 'length_score', 'achievement_count', 'word_count',
+    'extract_ms', 'score_ms'
+]
+
+def is_batch_document(name):
+    base = os.path.basename(name)
+    return base and not base.startswith('.') and name.lower().endswith(BATCH_EXTENSIONS)
+
+def documents_from_zip(stream, limit=BATCH_MAX_FILES):
+    """Read (filename, bytes) pairs for every PDF/DOCX entry of a zip archive"""
+    documents = []
+    with zipfile.ZipFile(stream) as archive:
+        for entry in archive.infolist():
+            if entry.is_dir() or '__MACOSX' in entry.filename or not is_batch_document(entry.filename):
+                continue
+            if len(documents) >= limit:
+                raise ValueError(f'Archive contains more than {limit} documents')
+            documents.append((entry.filename, archive.read(entry)))
+    return documents
+
+def documents_from_directory(directory, recursive=True):
+    """Yield (filename, path) pairs for every PDF/DOCX file under a directory"""
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            if is_batch_document(name):
+                yield os.path.relpath(os.path.join(root, name), directory), os.path.join(root, name)
+        if not recursive:
+            break
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[rank]
+
+def iter_batch(documents, worker, profile_name):
+    """Score documents in parallel, yielding one result row per document and then a summary.
+
+    `documents` yields (filename, bytes-or-path); `worker` is app.process_document.
+    """
+    started = time.perf_counter()
+    names = []
+
+    def jobs():
+        for filename, source in documents:
+            names.append(filename)
+            yield source, filename, None, profile_name
+
+    stage_times = {'extract': [], 'score': []}
+    succeeded = 0
+    failed = 0
+    for position, result, error in engine.map_documents(worker, jobs()):
+        row = {'filename': names[position], 'status': 'ok', 'error': ''}
+        if error is None:
+            text, analysis, timings = result
+            for stage, seconds in timings.items():
+                stage_times.setdefault(stage, []).append(seconds)
+            row['extract_ms'] = round(timings['extract'] * 1000, 2)
+            row['score_ms'] = round(timings['score'] * 1000, 2)
+            if analysis is None:
+                error = 'Could not extract enough text from file.'
+            else:
+                row.update({
+                    'final_score': analysis['final_score'],
+                    'rating': analysis['rating'],
+                    'keyword_score': analysis['keyword_score'],
+                    'contact_score': analysis['contact_score'],
+                    'length_score': analysis['length_score'],
+                    'achievement_count': analysis['achievements']['achievement_count'],
+                    'word_count': analysis['word_count']
+                })
+        if error is not None:
+            row['status'] = 'error'
+            row['error'] = str(error)
+            failed += 1
+        else:
+            succeeded += 1
+        yield row
+
+    elapsed = time.perf_counter() - started
+    yield {
+        'summary': {
+            'documents': succeeded + failed,
+            'succeeded': succeeded,
+            'failed': failed,
+            'elapsed_seconds': round(elapsed, 3),
+            'docs_per_second': round((succeeded + failed) / elapsed, 2) if elapsed > 0 else 0,
+            'workers': max(engine.EXTRACT_WORKERS, 1),
+            'stages_ms': {
+                stage: {
+                    'mean': round(sum(values) / len(values) * 1000, 2) if values else 0.0,
+                    'p50': round(percentile(values, 50) * 1000, 2),
+                    'p95': round(percentile(values, 95) * 1000, 2),
+                    'total': round(sum(values) * 1000, 2)
+                }
+                for stage, values in stage_times.items()
+            }
+        }
+    }
+
+def ndjson_lines(rows):
+    for row in rows:
+        yield json.dumps(row) + '\n'
+
+def csv_lines(rows):
+    """Render result rows as CSV; the summary follows as '#'-prefixed comment lines"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CSV_FIELDS, extrasaction='ignore')
+    writer.writeheader()
+    for row in rows:
+        if 'summary' in row:
+            for line in json.dumps(row['summary'], indent=2).splitlines():
+                buffer.write(f'# {line}\n')
+        else:
+            writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Score every PDF/DOCX resume in a directory.')
+    parser.add_argument('directory', help='directory to scan for resumes')
+    parser.add_argument('--profile', default=None, help='keyword profile name (default: the default profile)')
+    parser.add_argument('--format', choices=['ndjson', 'csv'], default='ndjson')
+    parser.add_argument('--workers', type=int, default=None, help='extraction processes (0 = run inline)')
+    parser.add_argument('--no-recursive', action='store_true', help='only scan the top-level directory')
+    parser.add_argument('--output', default='-', help='output file (default: stdout)')
+    args = parser.parse_args(argv)
+
+    if args.workers is not None:
+        engine.EXTRACT_WORKERS = args.workers
+
+    from app import process_document
+    from keywords import get_profile
+
+    profile = get_profile(args.profile)
+    if profile is None:
+        parser.error(f'unknown profile: {args.profile}')
+
+    documents = documents_from_directory(args.directory, recursive=not args.no_recursive)
+    render = csv_lines if args.format == 'csv' else ndjson_lines
+    output = sys.stdout if args.output == '-' else open(args.output, 'w', newline='', encoding='utf-8')
+    summary = {}
+
+    def rows():
+        for row in iter_batch(documents, process_document, profile['name']):
+            summary.update(row.get('summary', {}))
+            yield row
+
+    try:
+        for chunk in render(rows()):
+            output.write(chunk)
+            output.flush()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    print(f"📦 {summary['documents']} documents ({summary['failed']} failed) in "
+          f"{summary['elapsed_seconds']}s - {summary['docs_per_second']} docs/sec", file=sys.stderr)
+    for stage, stats in summary['stages_ms'].items():
+        print(f"   {stage}: mean {stats['mean']}ms, p50 {stats['p50']}ms, p95 {stats['p95']}ms", file=sys.stderr)
+    return 1 if summary['failed'] else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
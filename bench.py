@@ -0,0 +1,301 @@
+import io
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+from concurrent.futures import ProcessPoolExecutor
+
+import docx
+
+import app as analyzer
+from batch import percentile
+from keywords import get_profile
+
+# ============================================
+# BENCHMARK SUITE
+# ============================================
+# Generates synthetic PDF/DOCX resumes of controlled size, times every stage
+# of the analysis pipeline separately and writes a JSON baseline that later
+# runs can be compared against (--compare).
+#
+#   python bench.py --docs 40 --pages 3 --tables 1 --density 0.08 --output baseline.json
+#   python bench.py --docs 40 --pages 3 --tables 1 --density 0.08 --compare baseline.json
+
+FILLER = (
+    'the team project system data users service platform support process client quality '
+    'results across multiple using within delivered including various features reporting '
+    'internal customers production business daily weekly stakeholders requirements design'
+).split()
+
+SECTIONS = ['Summary', 'Experience', 'Projects', 'Skills', 'Education', 'Achievements', 'Certifications']
+
+ACHIEVEMENT_LINES = [
+    'Secured 1st rank in university coding contest',
+    'Won first prize in national hackathon',
+    'Gold medal for outstanding performance',
+    'Ranked #3 in regional programming olympiad',
+    'Received excellence award for delivery',
+]
+
+# ============================================
+# SYNTHETIC CORPUS
+# ============================================
+def synthetic_resume(rng, pages=2, tables=1, density=0.08, lines_per_page=45):
+    """Return (lines, tables) for one synthetic resume.
+
+    `density` is the share of words drawn from the keyword dictionary; each
+    table is a list of rows of cell strings.
+    """
+    keywords = [kw for entries in get_profile()['categories'].values() for kw in entries]
+    lines = [
+        f'Candidate {rng.randint(1000, 9999)}',
+        f'Email: candidate{rng.randint(1, 99999)}@example.com  Phone: +91 9{rng.randint(100000000, 999999999)}',
+        'LinkedIn: linkedin.com/in/candidate  GitHub: github.com/candidate',
+    ]
+    total_lines = max(pages * lines_per_page - 3, 1)
+    for i in range(total_lines):
+        if i % 12 == 0:
+            lines.append(SECTIONS[(i // 12) % len(SECTIONS)])
+            continue
+        if rng.random() < 0.15:
+            lines.append('- ' + rng.choice(ACHIEVEMENT_LINES))
+            continue
+        words = [rng.choice(keywords) if rng.random() < density else rng.choice(FILLER) for _ in range(rng.randint(6, 14))]
+        prefix = '- ' if rng.random() < 0.5 else ''
+        lines.append(prefix + ' '.join(words).capitalize())
+
+    table_rows = []
+    for _ in range(tables):
+        table_rows.append([[rng.choice(keywords).title() for _ in range(3)] for _ in range(rng.randint(3, 6))])
+    return lines, table_rows
+
+def _pdf_escape(value):
+    return value.encode('latin-1', 'replace').decode('latin-1').replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+def render_pdf(lines, tables, lines_per_page=45):
+    """Write a minimal multi-page PDF (Helvetica text, tables as column-aligned rows)"""
+    page_streams = []
+    for start in range(0, len(lines), lines_per_page):
+        chunk = lines[start:start + lines_per_page]
+        ops = ['BT /F1 10 Tf 12 TL 50 780 Td'] + [f'({_pdf_escape(line)}) Tj T*' for line in chunk] + ['ET']
+        page_streams.append('\n'.join(ops))
+    y = 760
+    table_ops = []
+    for table in tables:
+        for row in table:
+            for column, cell in enumerate(row):
+                table_ops.append(f'BT /F1 10 Tf {50 + column * 170} {y} Td ({_pdf_escape(cell)}) Tj ET')
+            y -= 14
+        y -= 10
+    if table_ops:
+        page_streams.append('\n'.join(table_ops))
+
+    objects = [b'<< /Type /Catalog /Pages 2 0 R >>', None, b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>']
+    kids = []
+    for stream in page_streams:
+        content = stream.encode('latin-1')
+        page_id = len(objects) + 1
+        kids.append(f'{page_id} 0 R')
+        objects.append(
+            f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources << /Font << /F1 3 0 R >> >> '
+            f'/Contents {page_id + 1} 0 R >>'.encode('latin-1')
+        )
+        objects.append(b'<< /Length %d >>\nstream\n' % len(content) + content + b'\nendstream')
+    objects[1] = f'<< /Type /Pages /Kids [{" ".join(kids)}] /Count {len(kids)} >>'.encode('latin-1')
+
+    out = io.BytesIO()
+    out.write(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(out.tell())
+        out.write(b'%d 0 obj\n' % number + body + b'\nendobj\n')
+    xref = out.tell()
+    out.write(b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1))
+    for offset in offsets:
+        out.write(b'%010d 00000 n \n' % offset)
+    out.write(b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref))
+    return out.getvalue()
+
+def render_docx(lines, tables):
+    document = docx.Document()
+    for line in lines:
+        document.add_paragraph(line)
+    for table in tables:
+        grid = document.add_table(rows=len(table), cols=len(table[0]))
+        for r, row in enumerate(table):
+            for c, cell in enumerate(row):
+                grid.cell(r, c).text = cell
+    out = io.BytesIO()
+    document.save(out)
+    return out.getvalue()
+
+def generate_corpus(count, pages, tables, density, seed=42):
+    """Return [(kind, bytes)] alternating PDF and DOCX documents"""
+    rng = random.Random(seed)
+    corpus = []
+    for i in range(count):
+        lines, table_rows = synthetic_resume(rng, pages, tables, density)
+        if i % 2 == 0:
+            corpus.append(('pdf', render_pdf(lines, table_rows)))
+        else:
+            corpus.append(('docx', render_docx(lines, table_rows)))
+    return corpus
+
+# ============================================
+# TIMING
+# ============================================
+def time_document(kind, data):
+    """Run each pipeline stage on one document and return {stage: seconds}"""
+    timings = {}
+    started = time.perf_counter()
+    if kind == 'pdf':
+        text = analyzer.extract_text_from_pdf(io.BytesIO(data), analyzer.MAX_PAGES, analyzer.MAX_CHARS)
+    else:
+        text = analyzer.extract_text_from_docx(io.BytesIO(data))
+    timings['extract'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    document = analyzer.Document(text)
+    timings['document'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    analyzer.extract_contact_info(document)
+    timings['contact'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    analyzer.extract_achievements(document)
+    timings['achievements'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    analyzer.calculate_ats_score(document)
+    timings['score'] = time.perf_counter() - started
+    return kind, timings
+
+def summarize(results, elapsed):
+    samples = {}
+    for kind, timings in results:
+        for stage, seconds in timings.items():
+            name = f'{stage}_{kind}' if stage == 'extract' else stage
+            samples.setdefault(name, []).append(seconds)
+    return {
+        'documents': len(results),
+        'elapsed_seconds': round(elapsed, 3),
+        'docs_per_second': round(len(results) / elapsed, 2) if elapsed > 0 else 0,
+        'stages': {
+            name: {
+                'mean_ms': round(sum(values) / len(values) * 1000, 3),
+                'p50_ms': round(percentile(values, 50) * 1000, 3),
+                'p95_ms': round(percentile(values, 95) * 1000, 3),
+                'p99_ms': round(percentile(values, 99) * 1000, 3)
+            }
+            for name, values in samples.items()
+        }
+    }
+
+def run_single(corpus, repeat):
+    results = []
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for kind, data in corpus:
+            results.append(time_document(kind, data))
+    return summarize(results, time.perf_counter() - started)
+
+def run_multi(corpus, repeat, workers):
+    jobs = [item for _ in range(repeat) for item in corpus]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Warm the workers so process start-up is not counted as throughput
+        list(pool.map(time_document, *zip(*corpus[:workers])))
+        started = time.perf_counter()
+        results = list(pool.map(time_document, [k for k, _ in jobs], [d for _, d in jobs], chunksize=4))
+        elapsed = time.perf_counter() - started
+    return summarize(results, elapsed)
+
+# ============================================
+# BASELINES
+# ============================================
+def compare(report, baseline, threshold):
+    """Print per-stage deltas against a baseline; return True if any p50/p95 regressed beyond threshold"""
+    regressed = False
+    for run, summary in report['runs'].items():
+        previous = baseline.get('runs', {}).get(run)
+        if not previous:
+            continue
+        old_rate, new_rate = previous['docs_per_second'], summary['docs_per_second']
+        if old_rate:
+            change = (new_rate - old_rate) / old_rate
+            flag = ' ⚠️' if change < -threshold else ''
+            regressed |= bool(flag)
+            print(f"[{run}] docs/sec {old_rate} -> {new_rate} ({change:+.1%}){flag}")
+        for stage, stats in summary['stages'].items():
+            old = previous['stages'].get(stage)
+            if not old:
+                continue
+            for metric in ('p50_ms', 'p95_ms'):
+                if not old[metric]:
+                    continue
+                change = (stats[metric] - old[metric]) / old[metric]
+                flag = ' ⚠️' if change > threshold else ''
+                regressed |= bool(flag)
+                print(f"[{run}] {stage} {metric} {old[metric]} -> {stats[metric]} ({change:+.1%}){flag}")
+    return regressed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the resume analysis pipeline on a synthetic corpus.')
+    parser.add_argument('--docs', type=int, default=40, help='documents in the corpus (half PDF, half DOCX)')
+    parser.add_argument('--pages', type=int, default=2, help='pages of text per document')
+    parser.add_argument('--tables', type=int, default=1, help='tables per document')
+    parser.add_argument('--density', type=float, default=0.08, help='share of words taken from the keyword dictionary')
+    parser.add_argument('--repeat', type=int, default=1, help='passes over the corpus per run')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='processes for the multi-process run (0 skips it)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='write the JSON report here')
+    parser.add_argument('--compare', help='baseline JSON report to compare against')
+    parser.add_argument('--threshold', type=float, default=0.10, help='regression threshold as a fraction (default 0.10)')
+    parser.add_argument('--save-corpus', help='also write the generated documents to this directory')
+    args = parser.parse_args(argv)
+
+    corpus = generate_corpus(args.docs, args.pages, args.tables, args.density, args.seed)
+    if args.save_corpus:
+        os.makedirs(args.save_corpus, exist_ok=True)
+        for i, (kind, data) in enumerate(corpus):
+            with open(os.path.join(args.save_corpus, f'resume_{i:04d}.{kind}'), 'wb') as file:
+                file.write(data)
+
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'scoring_version': analyzer.SCORING_VERSION,
+            'corpus': {
+                'docs': args.docs, 'pages': args.pages, 'tables': args.tables,
+                'density': args.density, 'seed': args.seed, 'repeat': args.repeat,
+                'bytes': sum(len(data) for _, data in corpus)
+            }
+        },
+        'runs': {'single': run_single(corpus, args.repeat)}
+    }
+    if args.workers > 0:
+        report['runs'][f'multi_{args.workers}'] = run_multi(corpus, args.repeat, args.workers)
+
+    for run, summary in report['runs'].items():
+        print(f"⏱️  {run}: {summary['documents']} docs in {summary['elapsed_seconds']}s - {summary['docs_per_second']} docs/sec")
+        for stage, stats in summary['stages'].items():
+            print(f"   {stage:<13} p50 {stats['p50_ms']:>9}ms  p95 {stats['p95_ms']:>9}ms  p99 {stats['p99_ms']:>9}ms")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as file:
+            baseline = json.load(file)
+        if compare(report, baseline, args.threshold):
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
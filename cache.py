@@ -0,0 +1,95 @@
+import os
+import time
+import tempfile
+import threading
+from collections import OrderedDict
+
+# ============================================
+# RESULT CACHE
+# ============================================
+# Values are strings (extracted text or serialized analysis JSON) keyed by
+# content hash. The in-process tier is a bounded LRU; the optional disk tier
+# is shared by every gunicorn worker pointed at the same directory. Both
+# tiers expire entries after `ttl` seconds.
+
+class ResultCache:
+    def __init__(self, name, max_entries=256, ttl=3600, directory=None):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.directory = os.path.join(directory, name) if directory else None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _disk_path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def _read_disk(self, key):
+        path = self._disk_path(key)
+        try:
+            remaining = self.ttl - (time.time() - os.path.getmtime(path))
+            if remaining <= 0:
+                os.remove(path)
+                return None, 0
+            with open(path, 'r', encoding='utf-8') as file:
+                return file.read(), remaining
+        except OSError:
+            return None, 0
+
+    def _write_disk(self, key, value):
+        path = self._disk_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as file:
+                file.write(value)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Cache write error: {e}")
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+
+        value, remaining = self._read_disk(key) if self.directory else (None, 0)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._store(key, value, now + remaining)
+        return value
+
+    def _store(self, key, value, expires):
+        self._entries[key] = (expires, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def set(self, key, value):
+        with self._lock:
+            self._store(key, value, time.monotonic() + self.ttl)
+        if self.directory:
+            self._write_disk(key, value)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': round((self.hits + self.disk_hits) / lookups, 3) if lookups else 0
+            }
@@ -0,0 +1,240 @@
+import os
+import re
+import time
+import struct
+import sqlite3
+import hashlib
+import tempfile
+import threading
+
+# NumPy is optional (the signature minimum is then taken in pure Python) and
+# slow to import, so it is only loaded by the first call that can use it
+np = None
+_numpy_checked = False
+
+def _numpy():
+    global np, _numpy_checked
+    if not _numpy_checked:
+        try:
+            import numpy as np
+        except ImportError:
+            np = None
+        _numpy_checked = True
+    return np
+
+# ============================================
+# NEAR-DUPLICATE DETECTION
+# ============================================
+# Each analyzed text gets a MinHash signature over its word 3-grams. The
+# signature is split into LSH bands stored in SQLite, so finding earlier
+# near-duplicates only probes DEDUPE_BANDS buckets instead of comparing with
+# the whole history. Only the first document of a duplicate group is added
+# to the buckets, so repeated copies do not make the probes any slower.
+#
+# Uploads are recorded with their submitter (a configured API key, or none).
+# Every near-duplicate is kept for the admin listing, but a caller is only
+# ever told about earlier uploads from the same submitter: two people's
+# resumes built from one template are often near-duplicates, and the other
+# upload's name, time and analysis are not theirs to see. The first upload of
+# a group by each submitter is therefore added to the buckets as well.
+
+DEDUPE_DB = os.environ.get('ATS_DEDUPE_DB', os.path.join(tempfile.gettempdir(), 'ats_dedupe.sqlite3'))
+# 'flag' reports near-duplicates, 'reuse' returns the earlier analysis, 'off' disables detection
+DEDUPE_MODE = os.environ.get('ATS_DEDUPE', 'off').lower()
+DEDUPE_THRESHOLD = float(os.environ.get('ATS_DEDUPE_THRESHOLD', '0.9'))
+DEDUPE_MODES = ('flag', 'reuse', 'off')
+
+NUM_PERM = 128
+DEDUPE_BANDS = 16
+BAND_ROWS = NUM_PERM // DEDUPE_BANDS
+SHINGLE_SIZE = 3
+# Candidates read per bucket; buckets only hold one document per duplicate group
+BUCKET_LIMIT = 50
+
+WORD_PATTERN = re.compile(r'\w+')
+_SIGNATURE = struct.Struct(f'<{NUM_PERM}I')
+
+_initialized_pid = None
+_init_lock = threading.Lock()
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS signatures (
+    id INTEGER PRIMARY KEY,
+    digest TEXT NOT NULL UNIQUE,
+    filename TEXT NOT NULL,
+    signature BLOB NOT NULL,
+    duplicate_of INTEGER,
+    similarity REAL,
+    created REAL NOT NULL,
+    submitter TEXT,
+    own_duplicate_of INTEGER,
+    own_similarity REAL
+);
+CREATE INDEX IF NOT EXISTS signatures_duplicate_of ON signatures (duplicate_of);
+CREATE TABLE IF NOT EXISTS bands (
+    band INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    signature_id INTEGER NOT NULL,
+    PRIMARY KEY (band, bucket, signature_id)
+) WITHOUT ROWID;
+'''
+
+# Columns added after the first release, for signature tables created before
+_ADDED_COLUMNS = (('submitter', 'TEXT'), ('own_duplicate_of', 'INTEGER'), ('own_similarity', 'REAL'))
+
+def minhash_signature(text):
+    """Return the MinHash signature of a text as NUM_PERM 32-bit values packed in bytes.
+
+    Every word 3-gram is hashed once with SHAKE-128, whose output provides
+    the NUM_PERM independent hash values; the signature is their column-wise
+    minimum.
+    """
+    words = WORD_PATTERN.findall(text.lower())
+    shingles = {' '.join(words[i:i + SHINGLE_SIZE]) for i in range(max(1, len(words) - SHINGLE_SIZE + 1))}
+    rows = [hashlib.shake_128(shingle.encode('utf-8')).digest(_SIGNATURE.size) for shingle in shingles]
+    if _numpy() is not None:
+        values = np.frombuffer(b''.join(rows), dtype='<u4').reshape(-1, NUM_PERM).min(axis=0)
+        return values.astype('<u4').tobytes()
+    return _SIGNATURE.pack(*map(min, zip(*map(_SIGNATURE.unpack, rows))))
+
+def similarity(signature, other):
+    """Estimated Jaccard similarity of the texts behind two signatures"""
+    values = _SIGNATURE.unpack(signature)
+    return sum(a == b for a, b in zip(values, _SIGNATURE.unpack(other))) / NUM_PERM
+
+def _buckets(signature):
+    width = BAND_ROWS * 4
+    return [
+        (band, int.from_bytes(hashlib.blake2b(signature[band * width:(band + 1) * width], digest_size=8).digest(),
+                              'big', signed=True))
+        for band in range(DEDUPE_BANDS)
+    ]
+
+def _connect():
+    conn = sqlite3.connect(DEDUPE_DB, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+def init_db():
+    """Create the signature tables once per process"""
+    global _initialized_pid
+    if _initialized_pid == os.getpid():
+        return
+    with _init_lock:
+        if _initialized_pid == os.getpid():
+            return
+        os.makedirs(os.path.dirname(DEDUPE_DB) or '.', exist_ok=True)
+        conn = _connect()
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(_SCHEMA)
+            columns = {row['name'] for row in conn.execute('PRAGMA table_info(signatures)')}
+            for name, kind in _ADDED_COLUMNS:
+                if name not in columns:
+                    conn.execute(f'ALTER TABLE signatures ADD COLUMN {name} {kind}')
+        finally:
+            conn.close()
+        _initialized_pid = os.getpid()
+
+def _describe(row, score):
+    return {
+        'digest': row['digest'],
+        'filename': row['filename'],
+        'similarity': round(score, 3),
+        'first_seen': row['created']
+    }
+
+def check_document(digest, filename, text, signature=None, submitter=None):
+    """Record a document and return its submitter's earlier near-duplicate ({digest, filename, similarity, first_seen}) or None.
+
+    Uploads without a submitter never get an answer, but are recorded for
+    duplicate_groups(). A document seen before keeps the answer it got the
+    first time. The signature is computed from `text` unless it is passed
+    in; with neither, an unknown document is not recorded.
+    """
+    init_db()
+    conn = _connect()
+    try:
+        known = conn.execute(
+            'SELECT s.submitter, s.own_duplicate_of, s.own_similarity, o.digest, o.filename, o.created '
+            'FROM signatures s LEFT JOIN signatures o ON o.id = s.own_duplicate_of WHERE s.digest = ?', (digest,)
+        ).fetchone()
+        if known is not None:
+            if submitter is None or known['submitter'] != submitter or known['own_duplicate_of'] is None:
+                return None
+            return _describe(known, known['own_similarity'])
+        if signature is None and text is None:
+            return None
+
+        signature = signature or minhash_signature(text)
+        buckets = _buckets(signature)
+        candidates = set()
+        for band, bucket in buckets:
+            candidates.update(row[0] for row in conn.execute(
+                'SELECT signature_id FROM bands WHERE band = ? AND bucket = ? LIMIT ?', (band, bucket, BUCKET_LIMIT)
+            ))
+
+        best = own = None
+        best_score = own_score = 0.0
+        for candidate in candidates:
+            row = conn.execute(
+                'SELECT id, digest, filename, signature, created, submitter FROM signatures WHERE id = ?', (candidate,)
+            ).fetchone()
+            score = similarity(signature, row['signature'])
+            if score >= DEDUPE_THRESHOLD and score > best_score:
+                best, best_score = row, score
+            if submitter is not None and row['submitter'] == submitter and score >= DEDUPE_THRESHOLD and score > own_score:
+                own, own_score = row, score
+
+        conn.execute('BEGIN IMMEDIATE')
+        signature_id = conn.execute(
+            'INSERT OR IGNORE INTO signatures (digest, filename, signature, duplicate_of, similarity, created, '
+            'submitter, own_duplicate_of, own_similarity) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (digest, filename, signature, best['id'] if best else None, best_score if best else None, time.time(),
+             submitter, own['id'] if own else None, own_score if own else None)
+        ).lastrowid
+        if signature_id and (best is None or (submitter is not None and own is None)):
+            conn.executemany(
+                'INSERT OR IGNORE INTO bands (band, bucket, signature_id) VALUES (?, ?, ?)',
+                [(band, bucket, signature_id) for band, bucket in buckets]
+            )
+        conn.execute('COMMIT')
+        return _describe(own, own_score) if own else None
+    except sqlite3.Error:
+        if conn.in_transaction:
+            conn.execute('ROLLBACK')
+        raise
+    finally:
+        conn.close()
+
+def duplicate_groups(page=1, per_page=20, members=20):
+    """Documents with near-duplicates, most recently duplicated first, each with its latest copies"""
+    init_db()
+    conn = _connect()
+    try:
+        groups = conn.execute(
+            'SELECT o.id, o.digest, o.filename, o.created, COUNT(d.id) AS copies, MAX(d.created) AS latest '
+            'FROM signatures o JOIN signatures d ON d.duplicate_of = o.id '
+            'GROUP BY o.id ORDER BY latest DESC LIMIT ? OFFSET ?',
+            (per_page, (page - 1) * per_page)
+        ).fetchall()
+        results = []
+        for group in groups:
+            copies = conn.execute(
+                'SELECT digest, filename, similarity, created FROM signatures '
+                'WHERE duplicate_of = ? ORDER BY created DESC LIMIT ?', (group['id'], members)
+            ).fetchall()
+            results.append({
+                'digest': group['digest'],
+                'filename': group['filename'],
+                'first_seen': group['created'],
+                'copies': group['copies'],
+                'duplicates': [
+                    {'digest': row['digest'], 'filename': row['filename'],
+                     'similarity': round(row['similarity'], 3), 'seen': row['created']}
+                    for row in copies
+                ]
+            })
+        return results
+    finally:
+        conn.close()
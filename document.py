@@ -0,0 +1,61 @@
+import re
+from bisect import bisect_right
+from functools import cached_property
+
+from sections import split_sections
+
+# ============================================
+# RESUME DOCUMENT
+# ============================================
+# Extracted text is wrapped once per analysis in a Document that holds what
+# the analyzers would otherwise each derive from the raw string again: the
+# lowercased text, its lines and words, page and line offsets, the sections
+# and the set of word tokens. Lines and words are split up front because
+# every analysis needs them; everything else is computed on first use and
+# kept, so an analyzer that needs it later gets it for free.
+
+_WORD_PATTERN = re.compile(r'\w+')
+
+class Document:
+    def __init__(self, text):
+        self.text = text
+        self.lower = text.lower()
+        self.lines = text.split('\n')
+        # Lowercasing never adds or removes line breaks, so these pair up with `lines`
+        self.lower_lines = self.lower.split('\n')
+        self.words = text.split()
+
+    @cached_property
+    def page_starts(self):
+        """Character offsets where pages 2..n begin (after each form feed)"""
+        return [match.end() for match in re.finditer('\f', self.text)]
+
+    @cached_property
+    def line_starts(self):
+        """Character offset of each entry in `lines`"""
+        starts = [0]
+        for line in self.lines[:-1]:
+            starts.append(starts[-1] + len(line) + 1)
+        return starts
+
+    @cached_property
+    def sections(self):
+        """[(title, start offset, section text)] as returned by split_sections()"""
+        return split_sections(self.text)
+
+    @cached_property
+    def tokens(self):
+        """Set of the lowercased word tokens"""
+        return frozenset(_WORD_PATTERN.findall(self.lower))
+
+    def page_at(self, offset):
+        """1-based page number of a character offset"""
+        return bisect_right(self.page_starts, offset) + 1
+
+    def line_at(self, offset):
+        """Index into `lines` of the line containing a character offset"""
+        return bisect_right(self.line_starts, offset) - 1
+
+def as_document(text):
+    """Return `text` as a Document, wrapping plain strings"""
+    return text if isinstance(text, Document) else Document(text)
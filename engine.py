@@ -0,0 +1,185 @@
+import os
+import time
+import signal
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+try:
+    import resource
+except ImportError:  # not available on Windows; limits are skipped there
+    resource = None
+
+# ============================================
+# EXTRACTION ENGINE
+# ============================================
+# CPU-heavy document work runs in a bounded process pool so one pathological
+# upload cannot stall the web worker. Each document gets a wall-clock timeout
+# in the parent and a CPU-time budget enforced inside the child (RLIMIT_CPU);
+# children also run under an address-space cap (RLIMIT_AS).
+
+EXTRACT_WORKERS = int(os.environ.get('ATS_EXTRACT_WORKERS', min(4, os.cpu_count() or 1)))
+EXTRACT_TIMEOUT = float(os.environ.get('ATS_EXTRACT_TIMEOUT', '20'))
+EXTRACT_CPU_LIMIT = int(os.environ.get('ATS_EXTRACT_CPU_LIMIT', '15'))
+EXTRACT_MEMORY_MB = int(os.environ.get('ATS_EXTRACT_MEMORY_MB', '1024'))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+class DocumentTimeout(Exception):
+    """The document exceeded its wall-clock or CPU budget"""
+
+class DocumentRejected(Exception):
+    """The document crashed or exhausted the memory of its worker"""
+
+class _CpuBudgetExceeded(BaseException):
+    # BaseException so the extractors' broad `except Exception` cannot swallow it
+    pass
+
+def _on_cpu_limit(signum, frame):
+    raise _CpuBudgetExceeded()
+
+def _init_worker(memory_mb):
+    if resource is None:
+        return
+    signal.signal(signal.SIGXCPU, _on_cpu_limit)
+    if memory_mb > 0:
+        limit = memory_mb * 1024 * 1024
+        _, hard = resource.getrlimit(resource.RLIMIT_AS)
+        if hard != resource.RLIM_INFINITY:
+            limit = min(limit, hard)
+        resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+
+def _run_limited(cpu_limit, fn, args):
+    if resource is None or cpu_limit <= 0:
+        return fn(*args)
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    budget = int(usage.ru_utime + usage.ru_stime) + cpu_limit
+    if hard != resource.RLIM_INFINITY:
+        budget = min(budget, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (budget, hard))
+    try:
+        return fn(*args)
+    except _CpuBudgetExceeded:
+        raise DocumentTimeout(f'Document exceeded {cpu_limit}s of CPU time')
+    except MemoryError:
+        raise DocumentRejected('Document exceeded the extraction memory limit')
+    finally:
+        resource.setrlimit(resource.RLIMIT_CPU, (hard, hard))
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=EXTRACT_WORKERS,
+                initializer=_init_worker,
+                initargs=(EXTRACT_MEMORY_MB,)
+            )
+        return _pool
+
+def _discard_pool(pool):
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def run_document(fn, *args, timeout=None):
+    """Run fn(*args) in the extraction pool, raising DocumentTimeout/DocumentRejected on failure"""
+    if EXTRACT_WORKERS <= 0:
+        return fn(*args)
+
+    timeout = EXTRACT_TIMEOUT if timeout is None else timeout
+    pool = _get_pool()
+    try:
+        future = pool.submit(_run_limited, EXTRACT_CPU_LIMIT, fn, args)
+    except BrokenProcessPool:
+        _discard_pool(pool)
+        pool = _get_pool()
+        future = pool.submit(_run_limited, EXTRACT_CPU_LIMIT, fn, args)
+
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeout:
+        # A queued document is dropped; a running one is stopped by its CPU budget
+        future.cancel()
+        raise DocumentTimeout(f'Document took longer than {timeout:g}s to process')
+    except BrokenProcessPool:
+        _discard_pool(pool)
+        raise DocumentRejected('Document crashed its extraction worker')
+    except MemoryError:
+        raise DocumentRejected('Document exceeded the extraction memory limit')
+
+def map_documents(fn, arg_list, timeout=None):
+    """Run fn over an iterable of argument tuples, yielding (position, result, error) as each finishes.
+
+    At most twice the pool size is in flight, so arguments are pulled lazily and
+    the wall-clock timeout is measured per document from its submission.
+    """
+    timeout = EXTRACT_TIMEOUT if timeout is None else timeout
+    arg_iter = enumerate(arg_list)
+    if EXTRACT_WORKERS <= 0:
+        for position, args in arg_iter:
+            try:
+                yield position, fn(*args), None
+            except Exception as e:
+                yield position, None, e
+        return
+
+    pool = _get_pool()
+    window = EXTRACT_WORKERS * 2
+    pending = {}
+    broken = False
+    exhausted = False
+    while pending or not exhausted:
+        while not exhausted and not broken and len(pending) < window:
+            try:
+                position, args = next(arg_iter)
+            except StopIteration:
+                exhausted = True
+                break
+            try:
+                future = pool.submit(_run_limited, EXTRACT_CPU_LIMIT, fn, args)
+            except BrokenProcessPool:
+                broken = True
+                yield position, None, DocumentRejected('Document crashed its extraction worker')
+                break
+            pending[future] = (position, time.monotonic() + timeout)
+        if broken and not pending:
+            _discard_pool(pool)
+            pool = _get_pool()
+            broken = False
+            continue
+        if not pending:
+            break
+
+        next_deadline = min(deadline for _, deadline in pending.values())
+        done, _ = wait(pending, timeout=max(0, next_deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+        for future in done:
+            position, _ = pending.pop(future)
+            try:
+                yield position, future.result(), None
+            except BrokenProcessPool:
+                broken = True
+                yield position, None, DocumentRejected('Document crashed its extraction worker')
+            except MemoryError:
+                yield position, None, DocumentRejected('Document exceeded the extraction memory limit')
+            except Exception as e:
+                yield position, None, e
+        now = time.monotonic()
+        for future, (position, deadline) in list(pending.items()):
+            if deadline <= now and not future.done():
+                future.cancel()
+                del pending[future]
+                yield position, None, DocumentTimeout(f'Document took longer than {timeout:g}s to process')
+
+def pool_stats():
+    return {
+        'workers': EXTRACT_WORKERS,
+        'running': _pool is not None,
+        'timeout_seconds': EXTRACT_TIMEOUT,
+        'cpu_limit_seconds': EXTRACT_CPU_LIMIT,
+        'memory_limit_mb': EXTRACT_MEMORY_MB
+    }
@@ -0,0 +1,29 @@
+import gc
+import os
+import tempfile
+
+# ============================================
+# GUNICORN SETTINGS
+# ============================================
+# The app is imported once in the master and forked into the workers, so
+# Flask, the compiled keyword indexes and the other read-only module state are
+# loaded once per instance and shared copy-on-write instead of rebuilt by each
+# worker. Nothing at import time starts threads, pools or connections: those
+# are created lazily in each worker after the fork.
+
+preload_app = True
+
+# Admitted uploads and those queued for a slot each hold a thread; the extra
+# threads keep /health and the other cheap endpoints answerable while they do
+MAX_IN_FLIGHT = int(os.environ.get('ATS_MAX_IN_FLIGHT', '8'))
+MAX_WAITING = int(os.environ.get('ATS_MAX_WAITING', '16'))
+threads = int(os.environ.get('ATS_GUNICORN_THREADS', str(MAX_IN_FLIGHT + MAX_WAITING + 4)))
+
+# The metrics directory is named after the gunicorn master; with preloading
+# the app is imported in the master itself, so its pid is set here
+os.environ.setdefault('ATS_METRICS_DIR', os.path.join(tempfile.gettempdir(), f'ats_metrics_{os.getpid()}'))
+
+def pre_fork(server, worker):
+    # Move everything loaded so far out of the collector's reach, so collections
+    # in the workers do not write to (and thereby copy) the shared pages
+    gc.freeze()
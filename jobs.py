@@ -0,0 +1,203 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import tempfile
+import threading
+import urllib.request
+
+# ============================================
+# ASYNC JOB QUEUE
+# ============================================
+# Uploads submitted in async mode are persisted in a local SQLite database
+# and processed by background threads in whichever web worker claims them
+# first. Results stay queryable through /jobs/<id> for JOB_RETENTION seconds
+# and are optionally POSTed to a webhook when the job finishes.
+
+JOB_DB = os.environ.get('ATS_JOB_DB', os.path.join(tempfile.gettempdir(), 'ats_jobs.sqlite3'))
+JOB_THREADS = int(os.environ.get('ATS_JOB_THREADS', '2'))
+JOB_RETENTION = int(os.environ.get('ATS_JOB_RETENTION', '86400'))
+JOB_MAX_ATTEMPTS = int(os.environ.get('ATS_JOB_MAX_ATTEMPTS', '3'))
+# A running job whose worker has not finished it within this many seconds is requeued
+JOB_STALE_AFTER = int(os.environ.get('ATS_JOB_STALE_AFTER', '300'))
+WEBHOOK_URL = os.environ.get('ATS_JOB_WEBHOOK_URL', '')
+# Per-job callback URLs are only accepted when they start with one of these prefixes
+WEBHOOK_ALLOWED = [p.strip() for p in os.environ.get('ATS_WEBHOOK_ALLOWED', '').split(',') if p.strip()]
+
+_workers_pid = None
+_workers_lock = threading.Lock()
+_wakeup = threading.Event()
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    profile TEXT NOT NULL,
+    payload BLOB,
+    callback_url TEXT,
+    result TEXT,
+    error TEXT,
+    status_code INTEGER,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created REAL NOT NULL,
+    started REAL,
+    finished REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created);
+'''
+
+def _connect():
+    conn = sqlite3.connect(JOB_DB, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+def init_db():
+    os.makedirs(os.path.dirname(JOB_DB) or '.', exist_ok=True)
+    conn = _connect()
+    try:
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.executescript(_SCHEMA)
+    finally:
+        conn.close()
+
+def callback_allowed(url):
+    return any(url.startswith(prefix) for prefix in WEBHOOK_ALLOWED)
+
+def submit_job(data, filename, profile_name, callback_url=None):
+    """Persist an upload and return its job id"""
+    job_id = uuid.uuid4().hex
+    conn = _connect()
+    try:
+        conn.execute(
+            'INSERT INTO jobs (id, status, filename, profile, payload, callback_url, created) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (job_id, 'queued', filename, profile_name, data, callback_url, time.time())
+        )
+    finally:
+        conn.close()
+    _wakeup.set()
+    return job_id
+
+def get_job(job_id):
+    conn = _connect()
+    try:
+        row = conn.execute(
+            'SELECT id, status, filename, profile, result, error, status_code, attempts, created, started, finished '
+            'FROM jobs WHERE id = ?', (job_id,)
+        ).fetchone()
+    finally:
+        conn.close()
+    return dict(row) if row else None
+
+def queue_stats():
+    conn = _connect()
+    try:
+        rows = conn.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall()
+    finally:
+        conn.close()
+    return {status: count for status, count in rows}
+
+def _claim_job():
+    conn = _connect()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        now = time.time()
+        conn.execute(
+            "UPDATE jobs SET status = 'queued' WHERE status = 'running' AND started < ? AND attempts < ?",
+            (now - JOB_STALE_AFTER, JOB_MAX_ATTEMPTS)
+        )
+        conn.execute(
+            "UPDATE jobs SET status = 'failed', error = 'Job abandoned after repeated worker failures', "
+            "payload = NULL, finished = ? WHERE status = 'running' AND started < ? AND attempts >= ?",
+            (now, now - JOB_STALE_AFTER, JOB_MAX_ATTEMPTS)
+        )
+        row = conn.execute(
+            "SELECT id, filename, profile, payload, callback_url FROM jobs "
+            "WHERE status = 'queued' ORDER BY created LIMIT 1"
+        ).fetchone()
+        if row:
+            conn.execute(
+                "UPDATE jobs SET status = 'running', started = ?, attempts = attempts + 1 WHERE id = ?",
+                (now, row['id'])
+            )
+        conn.execute('COMMIT')
+        return dict(row) if row else None
+    except sqlite3.Error:
+        if conn.in_transaction:
+            conn.execute('ROLLBACK')
+        raise
+    finally:
+        conn.close()
+
+def _finish_job(job_id, status, result=None, error=None, status_code=None):
+    conn = _connect()
+    try:
+        conn.execute(
+            'UPDATE jobs SET status = ?, result = ?, error = ?, status_code = ?, payload = NULL, finished = ? '
+            'WHERE id = ?',
+            (status, result, error, status_code, time.time(), job_id)
+        )
+        conn.execute(
+            "DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished < ?",
+            (time.time() - JOB_RETENTION,)
+        )
+    finally:
+        conn.close()
+
+def _notify(job_id, url, status, result, error):
+    body = {'job_id': job_id, 'status': status}
+    if result is not None:
+        body['result'] = json.loads(result)
+    if error is not None:
+        body['error'] = error
+    req = urllib.request.Request(
+        url, data=json.dumps(body).encode('utf-8'),
+        headers={'Content-Type': 'application/json'}, method='POST'
+    )
+    for attempt in range(3):
+        try:
+            with urllib.request.urlopen(req, timeout=10):
+                return True
+        except OSError as e:
+            print(f"Webhook error for job {job_id} (attempt {attempt + 1}): {e}")
+            if attempt < 2:
+                time.sleep(2 ** attempt)
+    return False
+
+def _worker_loop(handler):
+    while True:
+        try:
+            job = _claim_job()
+        except sqlite3.Error as e:
+            print(f"Job queue error: {e}")
+            job = None
+        if job is None:
+            _wakeup.wait(1.0)
+            _wakeup.clear()
+            continue
+
+        try:
+            status_code, result, error = handler(job['payload'], job['filename'], job['profile'])
+        except Exception as e:
+            status_code, result, error = 500, None, f'Analysis failed: {str(e)}'
+        status = 'done' if error is None else 'failed'
+        _finish_job(job['id'], status, result, error, status_code)
+
+        url = job['callback_url'] or WEBHOOK_URL
+        if url:
+            _notify(job['id'], url, status, result, error)
+
+def ensure_workers(handler):
+    """Start the job threads once per process (again after a fork)"""
+    global _workers_pid
+    if _workers_pid == os.getpid():
+        return
+    with _workers_lock:
+        if _workers_pid == os.getpid():
+            return
+        init_db()
+        for i in range(JOB_THREADS):
+            threading.Thread(target=_worker_loop, args=(handler,), name=f'ats-job-{i}', daemon=True).start()
+        _workers_pid = os.getpid()
@@ -0,0 +1,291 @@
+import os
+import re
+import json
+import mmap
+import pickle
+import hashlib
+import tempfile
+import threading
+import time
+
+# ============================================
+# KEYWORD DICTIONARY PROFILES
+# ============================================
+# Every *.json file in DICTIONARY_DIR is one role/industry profile:
+#   {"name": "...", "version": "...", "categories": {category: [keywords]},
+#    "weights": {"keyword": 0.7, "contact": 2, "length": 0.5, "achievements": 1}}
+# "weights" is optional; missing entries take the SCORE_WEIGHTS defaults.
+# Each profile is compiled into an index snapshot under SNAPSHOT_DIR, keyed
+# by the file's SHA-256, so workers and restarts reuse the compiled tables
+# instead of rebuilding them.
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DICTIONARY_DIR = os.environ.get('ATS_DICTIONARY_DIR', os.path.join(BASE_DIR, 'dictionaries'))
+SNAPSHOT_DIR = os.environ.get('ATS_SNAPSHOT_DIR', os.path.join(tempfile.gettempdir(), 'ats_index_snapshots'))
+DEFAULT_PROFILE = os.environ.get('ATS_DEFAULT_PROFILE', 'general')
+RELOAD_INTERVAL = float(os.environ.get('ATS_RELOAD_INTERVAL', '5'))
+RELOAD_STAMP = os.path.join(SNAPSHOT_DIR, 'reload.stamp')
+SNAPSHOT_FORMAT = 1
+# Multipliers of the keyword, contact, length and achievement scores in the final score
+SCORE_WEIGHTS = {'keyword': 0.7, 'contact': 2, 'length': 0.5, 'achievements': 1}
+
+_profiles = {}
+_fingerprint = None
+_last_check = 0.0
+_reload_lock = threading.Lock()
+_load_stats = {'seconds': 0.0, 'compiled': 0, 'snapshots': 0}
+
+# ============================================
+# KEYWORD INDEX
+# ============================================
+def _is_word_char(char):
+    return char.isalnum() or char == '_'
+
+def _trie_pattern(keywords):
+    """Render keywords as a prefix-trie regex so matching cost follows keyword length, not count"""
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def render(node):
+        branches = [re.escape(char) + render(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        return f'(?:{body})?' if '' in node else body
+
+    return render(trie)
+
+def compile_keyword_tables(data):
+    """Build the serializable part of a keyword index (pattern source and lookup tables)"""
+    keywords = {}
+    for category, entries in data.items():
+        for entry in entries:
+            keywords.setdefault(entry.lower(), []).append((category, entry))
+
+    # The scan reports the longest keyword at each position, so remember
+    # which shorter keywords end on a word boundary inside a longer one
+    # (e.g. 'aws' inside 'aws certified').
+    prefixes = {}
+    for keyword in keywords:
+        for i in range(1, len(keyword)):
+            if not _is_word_char(keyword[i]) and keyword[:i] in keywords:
+                prefixes.setdefault(keyword, []).append(keyword[:i])
+
+    source = r'(?<!\w)(?=(' + _trie_pattern(keywords) + r')(?!\w))' if keywords else r'(?!)'
+    return {
+        'source': source,
+        'keywords': keywords,
+        'prefixes': prefixes
+    }
+
+# The only characters that match ASCII letters case-insensitively without
+# lowercasing to them (or that change length when lowercased)
+_FOLDING_CHARS = re.compile('[\u0130\u0131\u017f\u212a]')
+
+def index_from_tables(tables):
+    # Keywords are stored lowercased, so an all-ASCII index can scan lowercased
+    # text case-sensitively, which is about twice as fast as IGNORECASE
+    lowercase = all(keyword.isascii() for keyword in tables['keywords'])
+    return {
+        'source': tables['source'],
+        'pattern': re.compile(tables['source'], 0 if lowercase else re.IGNORECASE),
+        'lowercase': lowercase,
+        'keywords': tables['keywords'],
+        'prefixes': tables['prefixes']
+    }
+
+def build_keyword_index(data):
+    """Compile every category's keywords into one word-boundary-aware matcher"""
+    return index_from_tables(compile_keyword_tables(data))
+
+def match_keywords(text, index, text_lower=None):
+    """Scan text once and return {keyword: [character offsets]} for every hit.
+
+    `text_lower` may pass text.lower() when the caller already has it.
+    """
+    hits = {}
+    keywords = index['keywords']
+    prefixes = index['prefixes']
+    pattern = index['pattern']
+    if not index['lowercase']:
+        scanned = text
+    elif _FOLDING_CHARS.search(text) is None:
+        # Offsets in the lowercased text are the same as in the original
+        scanned = text.lower() if text_lower is None else text_lower
+    else:
+        scanned = text
+        pattern = re.compile(index['source'], re.IGNORECASE)
+    for match in pattern.finditer(scanned):
+        keyword = match.group(1).lower()
+        if keyword not in keywords:
+            continue
+        start = match.start()
+        hits.setdefault(keyword, []).append(start)
+        for prefix in prefixes.get(keyword, ()):
+            hits.setdefault(prefix, []).append(start)
+    return hits
+
+# ============================================
+# INDEX SNAPSHOTS
+# ============================================
+def _snapshot_path(name, digest):
+    return os.path.join(SNAPSHOT_DIR, f"{name}-{digest[:16]}.idx")
+
+def _read_snapshot(path, digest):
+    try:
+        with open(path, 'rb') as file:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                snapshot = pickle.loads(mapped)
+    except (OSError, ValueError, EOFError, pickle.UnpicklingError):
+        return None
+    if snapshot.get('format') != SNAPSHOT_FORMAT or snapshot.get('digest') != digest:
+        return None
+    return snapshot['tables']
+
+def _write_snapshot(path, digest, tables):
+    try:
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=SNAPSHOT_DIR, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as file:
+            pickle.dump({'format': SNAPSHOT_FORMAT, 'digest': digest, 'tables': tables}, file,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Snapshot write error: {e}")
+
+def profile_weights(spec):
+    """The profile's score weights over the SCORE_WEIGHTS defaults"""
+    weights = dict(SCORE_WEIGHTS)
+    for name, value in (spec.get('weights') or {}).items():
+        if name not in SCORE_WEIGHTS:
+            raise ValueError(f"Unknown score weight: {name}")
+        weights[name] = float(value)
+    return weights
+
+def final_score(weights, keyword_score, contact_score, length_score, achievement_score):
+    """Combine the component scores with a profile's weights"""
+    return round(
+        (keyword_score * weights['keyword']) + (contact_score * weights['contact'])
+        + (length_score * weights['length']) + (achievement_score * weights['achievements']), 1
+    )
+
+def load_profile(path, current=None):
+    """Load one dictionary file, reusing its compiled snapshot when one exists"""
+    with open(path, 'rb') as file:
+        raw = file.read()
+    digest = hashlib.sha256(raw).hexdigest()
+    if current and current['digest'] == digest:
+        return current
+    spec = json.loads(raw)
+    name = spec.get('name') or os.path.splitext(os.path.basename(path))[0]
+    categories = spec['categories']
+    weights = profile_weights(spec)
+
+    snapshot_path = _snapshot_path(name, digest)
+    tables = _read_snapshot(snapshot_path, digest)
+    if tables is None:
+        tables = compile_keyword_tables(categories)
+        _write_snapshot(snapshot_path, digest, tables)
+        _load_stats['compiled'] += 1
+    else:
+        _load_stats['snapshots'] += 1
+
+    return {
+        'name': name,
+        'version': str(spec.get('version', '0')),
+        'description': spec.get('description', ''),
+        'digest': digest,
+        'categories': categories,
+        'weights': weights,
+        'index': index_from_tables(tables)
+    }
+
+# ============================================
+# HOT RELOAD
+# ============================================
+def _dictionary_fingerprint():
+    entries = []
+    try:
+        for filename in sorted(os.listdir(DICTIONARY_DIR)):
+            if filename.endswith('.json'):
+                stat = os.stat(os.path.join(DICTIONARY_DIR, filename))
+                entries.append((filename, stat.st_mtime_ns, stat.st_size))
+    except OSError:
+        pass
+    try:
+        entries.append(('reload.stamp', os.stat(RELOAD_STAMP).st_mtime_ns, 0))
+    except OSError:
+        pass
+    return tuple(entries)
+
+def reload_profiles():
+    """Reload every dictionary file and swap the profile table in one assignment"""
+    global _profiles, _fingerprint
+    with _reload_lock:
+        started = time.perf_counter()
+        fingerprint = _dictionary_fingerprint()
+        loaded = {}
+        for filename, _, _ in fingerprint:
+            if not filename.endswith('.json'):
+                continue
+            path = os.path.join(DICTIONARY_DIR, filename)
+            previous = _profiles.get(os.path.splitext(filename)[0])
+            try:
+                profile = load_profile(path, previous)
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                print(f"Dictionary load error ({filename}): {e}")
+                if previous:
+                    loaded[previous['name']] = previous
+                continue
+            loaded[profile['name']] = profile
+        _profiles = loaded
+        _fingerprint = fingerprint
+        _load_stats['seconds'] = round(time.perf_counter() - started, 4)
+    return loaded
+
+def refresh_profiles():
+    """Cheap per-request check: reload when a dictionary file or the reload stamp changed"""
+    global _last_check
+    now = time.monotonic()
+    if now - _last_check < RELOAD_INTERVAL:
+        return
+    _last_check = now
+    if _dictionary_fingerprint() != _fingerprint:
+        reload_profiles()
+
+def request_reload():
+    """Touch the shared reload stamp so every worker reloads on its next check"""
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    with open(RELOAD_STAMP, 'a'):
+        os.utime(RELOAD_STAMP, None)
+    return reload_profiles()
+
+def get_profile(name=None):
+    profiles = _profiles
+    if name:
+        return profiles.get(name)
+    return profiles.get(DEFAULT_PROFILE) or next(iter(profiles.values()), None)
+
+def get_profiles():
+    """Every loaded profile"""
+    return list(_profiles.values())
+
+def profile_load_stats():
+    """Duration of the last reload and how many indexes were compiled vs read from snapshots so far"""
+    return dict(_load_stats)
+
+def list_profiles():
+    return [
+        {'name': p['name'], 'version': p['version'], 'description': p['description'], 'weights': p['weights']}
+        for p in _profiles.values()
+    ]
+
+reload_profiles()
+
+if __name__ == '__main__':
+    # Build step: compile every profile's snapshot ahead of the first boot
+    print(f"Keyword index snapshots in {SNAPSHOT_DIR}: {profile_load_stats()}")
@@ -0,0 +1,168 @@
+import os
+import re
+import math
+from collections import Counter
+
+from keywords import get_profile, match_keywords
+
+# NumPy is optional (a sparse pure-Python path is used without it) and
+# slow to import, so it is only loaded by the first call that can use it
+np = None
+_numpy_checked = False
+
+def _numpy():
+    global np, _numpy_checked
+    if not _numpy_checked:
+        try:
+            import numpy as np
+        except ImportError:
+            np = None
+        _numpy_checked = True
+    return np
+
+# ============================================
+# JOB DESCRIPTION MATCHING
+# ============================================
+# Resumes and job descriptions become sublinear TF-IDF vectors over a shared
+# vocabulary and are compared by cosine similarity. Only the terms of the job
+# descriptions can contribute to a dot product, so resumes are projected onto
+# that (small) vocabulary and the whole N x M similarity matrix comes out of
+# one matrix product, or one pass over posting lists without NumPy.
+
+MATCH_MAX_JOBS = int(os.environ.get('ATS_MATCH_MAX_JOBS', '20'))
+MATCH_TOP = int(os.environ.get('ATS_MATCH_TOP', '50'))
+MATCH_MISSING_LIMIT = int(os.environ.get('ATS_MATCH_MISSING_LIMIT', '15'))
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9][a-z0-9+#]*(?:[.\-/][a-z0-9+#]+)*')
+STOP_WORDS = frozenset('''
+    a about above after all also an and any are as at be been being both but by can could did do does
+    doing during each etc for from further had has have having he her here hers him his how i if in
+    into is it its itself just least may me more most must my no nor not of off on once only or other
+    our ours out over own per plus same she should so some such than that the their theirs them then
+    there these they this those through to too under until up upon us very via was we were what when
+    where which while who whom why will with within without would you your yours
+    ability able candidate candidates company experience good great ideal including job looking
+    preferred required requirements responsibilities role strong team work working years
+'''.split())
+
+def tokenize(text):
+    """Lowercased word tokens without stop words, numbers or single characters"""
+    return [
+        token for token in TOKEN_PATTERN.findall(text.lower())
+        if token not in STOP_WORDS and not token.isdigit() and (len(token) > 1 or token in ('c', 'r'))
+    ]
+
+def term_counts(text):
+    return Counter(tokenize(text))
+
+def _weights(counts, idf):
+    return {term: (1.0 + math.log(count)) * idf[term] for term, count in counts.items()}
+
+def similarity_matrix(resume_counts, job_counts):
+    """Cosine similarity of every resume against every job description.
+
+    Both arguments are lists of term Counters. Returns (matrix, job_weights):
+    matrix[i][j] compares resume i with job j, and job_weights holds each job's
+    TF-IDF weights, used to pick the missing terms.
+    """
+    documents = len(resume_counts) + len(job_counts)
+    frequency = Counter()
+    for counts in resume_counts:
+        frequency.update(counts.keys())
+    for counts in job_counts:
+        frequency.update(counts.keys())
+    idf = {term: math.log((1 + documents) / (1 + df)) + 1.0 for term, df in frequency.items()}
+
+    job_weights = [_weights(counts, idf) for counts in job_counts]
+    vocabulary = {}
+    for weights in job_weights:
+        for term in weights:
+            vocabulary.setdefault(term, len(vocabulary))
+    job_norms = [math.sqrt(sum(w * w for w in weights.values())) or 1.0 for weights in job_weights]
+
+    # Resume norms need every term; only vocabulary terms are kept afterwards
+    resume_norms = []
+    projected = []
+    for counts in resume_counts:
+        norm = 0.0
+        entries = []
+        for term, count in counts.items():
+            weight = (1.0 + math.log(count)) * idf[term]
+            norm += weight * weight
+            column = vocabulary.get(term)
+            if column is not None:
+                entries.append((column, weight))
+        resume_norms.append(math.sqrt(norm) or 1.0)
+        projected.append(entries)
+
+    if _numpy() is not None:
+        resumes = np.zeros((len(resume_counts), len(vocabulary)))
+        for row, entries in enumerate(projected):
+            if entries:
+                columns, values = zip(*entries)
+                resumes[row, list(columns)] = values
+        jobs = np.zeros((len(job_counts), len(vocabulary)))
+        for row, weights in enumerate(job_weights):
+            for term, weight in weights.items():
+                jobs[row, vocabulary[term]] = weight
+        matrix = (resumes @ jobs.T) / np.outer(resume_norms, job_norms)
+        return matrix.tolist(), job_weights
+
+    postings = [[] for _ in vocabulary]
+    for job, weights in enumerate(job_weights):
+        for term, weight in weights.items():
+            postings[vocabulary[term]].append((job, weight / job_norms[job]))
+    matrix = []
+    for entries, norm in zip(projected, resume_norms):
+        scores = [0.0] * len(job_counts)
+        for column, weight in entries:
+            for job, job_weight in postings[column]:
+                scores[job] += weight * job_weight
+        matrix.append([score / norm for score in scores])
+    return matrix, job_weights
+
+def rank_resumes(resume_texts, job_texts, profile=None, top=None):
+    """Rank resumes against each job description, best match first.
+
+    Returns one entry per job description with its profile keywords and up
+    to `top` matches; each match carries the resume's position, similarity,
+    keyword coverage and the keywords and terms of the job it lacks.
+    """
+    profile = profile or get_profile()
+    top = MATCH_TOP if top is None else top
+    index = profile['index']
+    resume_counts = [term_counts(text) for text in resume_texts]
+    job_counts = [term_counts(text) for text in job_texts]
+    matrix, job_weights = similarity_matrix(resume_counts, job_counts)
+
+    resume_keywords = {}
+    results = []
+    for job, text in enumerate(job_texts):
+        keywords = list(match_keywords(text, index))
+        important = sorted(job_weights[job], key=job_weights[job].get, reverse=True)
+        order = sorted(range(len(resume_texts)), key=lambda i: matrix[i][job], reverse=True)
+        if top > 0:
+            order = order[:top]
+
+        matches = []
+        for position in order:
+            # Keyword matching is only needed for resumes that are returned
+            if position not in resume_keywords:
+                resume_keywords[position] = match_keywords(resume_texts[position], index)
+            found = resume_keywords[position]
+            missing = [keyword for keyword in keywords if keyword not in found]
+            matches.append({
+                'resume': position,
+                'similarity': round(matrix[position][job], 4),
+                'keyword_coverage': round(1 - len(missing) / len(keywords), 3) if keywords else None,
+                'missing_keywords': [index['keywords'][keyword][0][1] for keyword in missing],
+                'missing_terms': [
+                    term for term in important if term not in resume_counts[position]
+                ][:MATCH_MISSING_LIMIT]
+            })
+        results.append({
+            'job': job,
+            'keywords': [index['keywords'][keyword][0][1] for keyword in keywords],
+            'matches': matches
+        })
+    return results
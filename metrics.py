@@ -0,0 +1,165 @@
+import os
+import json
+import time
+import atexit
+import tempfile
+import threading
+from contextlib import contextmanager
+
+# ============================================
+# METRICS
+# ============================================
+# Minimal counters and histograms rendered in the Prometheus text format.
+# Every process periodically writes its own totals to METRICS_DIR; /metrics
+# sums the files of all processes so the numbers cover every gunicorn worker,
+# whichever one serves the scrape.
+
+METRICS_DIR = os.environ.get(
+    'ATS_METRICS_DIR', os.path.join(tempfile.gettempdir(), f'ats_metrics_{os.getppid()}')
+)
+FLUSH_INTERVAL = float(os.environ.get('ATS_METRICS_FLUSH_INTERVAL', '1'))
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+HELP = {
+    'ats_stage_seconds': ('histogram', 'Time spent in each stage of the analysis pipeline'),
+    'ats_requests_total': ('counter', 'HTTP requests by endpoint and status code'),
+    'ats_bytes_processed_total': ('counter', 'Uploaded document bytes extracted'),
+    'ats_pages_processed_total': ('counter', 'PDF pages extracted'),
+    'ats_documents_total': ('counter', 'Documents analyzed by file type'),
+    'ats_extraction_failures_total': ('counter', 'Documents that could not be analyzed, by reason'),
+    'ats_cache_lookups_total': ('counter', 'Result cache lookups by tier and outcome'),
+    'ats_duplicates_total': ('counter', 'Uploads flagged as near-duplicates of an earlier upload'),
+    'ats_uploads_rejected_total': ('counter', 'Uploads rejected while streaming, by reason (type or size)'),
+    'ats_bytes_rejected_total': ('counter', 'Bytes of uploads rejected by the text layer probe, by file type'),
+    'ats_requests_shed_total': ('counter', 'Requests turned away by admission control, by reason (rate, queue or timeout)'),
+}
+
+_lock = threading.Lock()
+_pid = os.getpid()
+_counters = {}
+_histograms = {}
+_last_flush = 0.0
+
+def _labels_key(labels):
+    return tuple(sorted(labels.items()))
+
+def _check_fork():
+    # State inherited from a parent process belongs to the parent's file
+    global _pid, _counters, _histograms
+    if os.getpid() != _pid:
+        _pid = os.getpid()
+        _counters = {}
+        _histograms = {}
+
+def inc(name, amount=1, **labels):
+    with _lock:
+        _check_fork()
+        key = (name, _labels_key(labels))
+        _counters[key] = _counters.get(key, 0) + amount
+    _maybe_flush()
+
+def observe(name, seconds, **labels):
+    with _lock:
+        _check_fork()
+        key = (name, _labels_key(labels))
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = [0] * (len(BUCKETS) + 2)  # buckets..., count, sum
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                histogram[i] += 1
+        histogram[-2] += 1
+        histogram[-1] += seconds
+    _maybe_flush()
+
+@contextmanager
+def time_stage(stage):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe('ats_stage_seconds', time.perf_counter() - started, stage=stage)
+
+def _snapshot():
+    with _lock:
+        _check_fork()
+        return {
+            'counters': [[name, list(labels), value] for (name, labels), value in _counters.items()],
+            'histograms': [[name, list(labels), list(values)] for (name, labels), values in _histograms.items()]
+        }
+
+def flush():
+    global _last_flush
+    _last_flush = time.monotonic()
+    snapshot = _snapshot()
+    if not snapshot['counters'] and not snapshot['histograms']:
+        return
+    try:
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=METRICS_DIR, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as file:
+            json.dump(snapshot, file)
+        os.replace(tmp_path, os.path.join(METRICS_DIR, f'metrics-{os.getpid()}.json'))
+    except OSError as e:
+        print(f"Metrics flush error: {e}")
+
+def _maybe_flush():
+    if time.monotonic() - _last_flush >= FLUSH_INTERVAL:
+        flush()
+
+atexit.register(flush)
+
+def _merged():
+    counters = {}
+    histograms = {}
+    try:
+        filenames = [f for f in os.listdir(METRICS_DIR) if f.startswith('metrics-') and f.endswith('.json')]
+    except OSError:
+        filenames = []
+    for filename in filenames:
+        try:
+            with open(os.path.join(METRICS_DIR, filename), encoding='utf-8') as file:
+                snapshot = json.load(file)
+        except (OSError, ValueError):
+            continue
+        for name, labels, value in snapshot.get('counters', []):
+            key = (name, tuple(tuple(pair) for pair in labels))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, values in snapshot.get('histograms', []):
+            key = (name, tuple(tuple(pair) for pair in labels))
+            merged = histograms.setdefault(key, [0] * len(values))
+            for i, value in enumerate(values):
+                merged[i] += value
+    return counters, histograms
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    escaped = [(k, str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')) for k, v in pairs]
+    return '{' + ','.join(f'{k}="{v}"' for k, v in escaped) + '}'
+
+def render():
+    """Return every process's metrics, summed, in the Prometheus text exposition format"""
+    flush()
+    counters, histograms = _merged()
+    lines = []
+    for name, (kind, description) in HELP.items():
+        series = counters if kind == 'counter' else histograms
+        keys = sorted(key for key in series if key[0] == name)
+        if not keys:
+            continue
+        lines.append(f'# HELP {name} {description}')
+        lines.append(f'# TYPE {name} {kind}')
+        for key in keys:
+            labels = key[1]
+            if kind == 'counter':
+                lines.append(f'{name}{_format_labels(labels)} {series[key]}')
+                continue
+            values = series[key]
+            for bound, count in zip(BUCKETS, values):
+                lines.append(f'{name}_bucket{_format_labels(labels, [("le", bound)])} {count}')
+            lines.append(f'{name}_bucket{_format_labels(labels, [("le", "+Inf")])} {values[-2]}')
+            lines.append(f'{name}_count{_format_labels(labels)} {values[-2]}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {values[-1]}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,146 @@
+import io
+import os
+import re
+import time
+import zipfile
+
+# ============================================
+# TEXT LAYER PROBE
+# ============================================
+# Scanned resumes have no text layer, and full extraction only finds that out
+# after running PyPDF2's text extraction over every page. Before extracting,
+# the probe looks at the first pages' content streams (or the DOCX body XML)
+# for text at all, which takes milliseconds: a PDF page shows text only inside
+# BT ... ET text objects, a DOCX only in <w:t> runs. Uploads without any are
+# rejected with a reason code and the statistics gathered on the way. The
+# probe errs towards extracting: anything it cannot read is left to the full
+# extraction.
+
+PROBE_ENABLED = os.environ.get('ATS_PROBE', '1').lower() not in ('0', 'false', 'no')
+PROBE_PAGES = int(os.environ.get('ATS_PROBE_PAGES', '3'))
+# Form XObjects are followed this deep for text drawn through them
+FORM_DEPTH = 3
+DOCX_CHUNK = 64 * 1024
+
+# Reason codes
+IMAGE_ONLY = 'image_only'
+NO_TEXT_LAYER = 'no_text_layer'
+
+# Operators are delimited by whitespace or PDF delimiters
+_PDF_TEXT_OBJECT = re.compile(rb'(?<![^\s\[\]()<>{}/%])BT(?![^\s\[\]()<>{}/%])')
+_PDF_INLINE_IMAGE = re.compile(rb'(?<![^\s\[\]()<>{}/%])BI(?![^\s\[\]()<>{}/%])')
+_DOCX_TEXT = re.compile(rb'<w:t(?:\s[^>]*)?>[^<]*?[^\s<]')
+_DOCX_IMAGE = re.compile(rb'<w:(?:drawing|pict)\b')
+
+class NoTextLayer(Exception):
+    """The document has no text to extract; `report` holds the probe's reason code and statistics"""
+    def __init__(self, report):
+        super().__init__(report)
+        self.report = report
+
+    def __str__(self):
+        reason = self.report['reason']
+        if reason == IMAGE_ONLY:
+            return f'No text layer found ({reason}): the file contains only images (scanned document?)'
+        return f'No text layer found ({reason}): the file contains no text'
+
+def _upload_source(data):
+    if isinstance(data, bytes):
+        return io.BytesIO(data), len(data)
+    return data, os.path.getsize(data)
+
+def _scan_pdf_resources(resources, report, seen, depth):
+    fonts = resources.get('/Font')
+    if fonts:
+        report['fonts'] += len(fonts)
+    xobjects = resources.get('/XObject')
+    for name in xobjects or ():
+        xobject = xobjects[name].get_object()
+        if id(xobject) in seen:
+            continue
+        seen.add(id(xobject))
+        subtype = xobject.get('/Subtype')
+        if subtype == '/Image':
+            report['images'] += 1
+        elif subtype == '/Form' and depth < FORM_DEPTH:
+            _scan_pdf_content(xobject.get_data(), report)
+            if xobject.get('/Resources'):
+                _scan_pdf_resources(xobject['/Resources'], report, seen, depth + 1)
+
+def _scan_pdf_content(data, report):
+    report['content_bytes'] += len(data)
+    report['text_objects'] += len(_PDF_TEXT_OBJECT.findall(data))
+    report['images'] += len(_PDF_INLINE_IMAGE.findall(data))
+
+def probe_pdf(data, max_pages=PROBE_PAGES):
+    """Look for text objects on the first pages of a PDF given as bytes or a path"""
+    import PyPDF2  # imported on first use: slow to load and not needed to boot
+    started = time.perf_counter()
+    source, size = _upload_source(data)
+    report = {
+        'kind': 'pdf', 'reason': None, 'bytes': size, 'pages': 0, 'pages_probed': 0,
+        'content_bytes': 0, 'text_objects': 0, 'fonts': 0, 'images': 0, 'encrypted': False
+    }
+    try:
+        pdf_reader = PyPDF2.PdfReader(source)
+        # Content streams of an encrypted file may be unreadable: left to the full extraction
+        report['encrypted'] = pdf_reader.is_encrypted
+        report['pages'] = len(pdf_reader.pages)
+        seen = set()
+        for page in () if report['encrypted'] else pdf_reader.pages[:max_pages]:
+            report['pages_probed'] += 1
+            contents = page.get('/Contents')
+            streams = contents if isinstance(contents, list) else [contents] if contents is not None else []
+            for stream in streams:
+                _scan_pdf_content(stream.get_object().get_data(), report)
+            if page.get('/Resources'):
+                _scan_pdf_resources(page['/Resources'], report, seen, 0)
+            if report['text_objects']:
+                break
+        if report['pages_probed'] and not report['text_objects']:
+            report['reason'] = IMAGE_ONLY if report['images'] else NO_TEXT_LAYER
+    except Exception as e:
+        report['error'] = str(e)
+    report['seconds'] = round(time.perf_counter() - started, 6)
+    return report
+
+def probe_docx(data):
+    """Look for a non-blank text run in the body of a DOCX given as bytes or a path"""
+    started = time.perf_counter()
+    source, size = _upload_source(data)
+    report = {'kind': 'docx', 'reason': None, 'bytes': size, 'xml_bytes': 0, 'xml_bytes_read': 0, 'images': 0}
+    try:
+        with zipfile.ZipFile(source) as archive:
+            info = archive.getinfo('word/document.xml')
+            report['xml_bytes'] = info.file_size
+            found = False
+            tail = b''
+            with archive.open(info) as xml:
+                while not found:
+                    chunk = xml.read(DOCX_CHUNK)
+                    if not chunk:
+                        report['images'] += len(_DOCX_IMAGE.findall(tail))
+                        break
+                    report['xml_bytes_read'] += len(chunk)
+                    buffer = tail + chunk
+                    found = _DOCX_TEXT.search(buffer) is not None
+                    # An element cut off at the chunk end is scanned again with the next chunk
+                    cut = buffer.rfind(b'<')
+                    if cut < 0:
+                        cut = 0
+                    report['images'] += len(_DOCX_IMAGE.findall(buffer, 0, cut))
+                    tail = buffer[cut:]
+        if not found:
+            report['reason'] = IMAGE_ONLY if report['images'] else NO_TEXT_LAYER
+    except Exception as e:
+        report['error'] = str(e)
+    report['seconds'] = round(time.perf_counter() - started, 6)
+    return report
+
+def check_text_layer(data, filename):
+    """Probe an upload before extraction; raise NoTextLayer when it has no text"""
+    if not PROBE_ENABLED:
+        return
+    report = probe_pdf(data) if filename.lower().endswith('.pdf') else probe_docx(data)
+    if report['reason'] is not None:
+        raise NoTextLayer(report)
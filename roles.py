@@ -0,0 +1,143 @@
+import os
+import threading
+
+from keywords import build_keyword_index, final_score, match_keywords
+
+# NumPy is optional (a sparse pure-Python path is used without it) and
+# slow to import, so it is only loaded by the first call that can use it
+np = None
+_numpy_checked = False
+
+def _numpy():
+    global np, _numpy_checked
+    if not _numpy_checked:
+        try:
+            import numpy as np
+        except ImportError:
+            np = None
+        _numpy_checked = True
+    return np
+
+# ============================================
+# ROLE FIT
+# ============================================
+# Scores one resume against many keyword profiles in one pass. The keywords
+# of all profiles are compiled into one combined index, so the text is
+# scanned once, and the hits become a 0/1 vector over the combined keywords.
+# A matrix with one row per (profile, category) holds how many of that
+# category's entries each keyword stands for; its product with the hit
+# vector gives every category's found count for every profile at once.
+# Contact, length and achievement scores do not depend on the profile and
+# are computed once by the caller. Each profile's weights then combine the
+# components exactly as /analyze does for that profile.
+
+ROLES_TOP = int(os.environ.get('ATS_ROLES_TOP', '10'))
+# Combined indexes kept per process, keyed by the profiles' names and digests
+ROLE_MATRIX_CACHE = int(os.environ.get('ATS_ROLE_MATRIX_CACHE', '4'))
+
+_matrices = {}
+_matrices_lock = threading.Lock()
+
+class RoleMatrix:
+    """Combined keyword index and (profile, category) x keyword count matrix for a set of profiles"""
+    def __init__(self, profiles):
+        self.profiles = profiles
+        columns = {}
+        for profile in profiles:
+            for keyword in profile['index']['keywords']:
+                columns.setdefault(keyword, len(columns))
+        self.columns = columns
+        self.index = build_keyword_index({'roles': list(columns)})
+
+        # rows[r] = (profile position, category); profile rows are contiguous
+        self.rows = []
+        self.possible = []
+        postings = [[] for _ in columns]
+        for position, profile in enumerate(profiles):
+            rows = {}
+            for category, entries in profile['categories'].items():
+                rows[category] = len(self.rows)
+                self.rows.append((position, category))
+                self.possible.append(len(entries))
+            for keyword, entries in profile['index']['keywords'].items():
+                counts = {}
+                for category, _ in entries:
+                    counts[rows[category]] = counts.get(rows[category], 0) + 1
+                postings[columns[keyword]].extend(counts.items())
+        self.postings = postings
+
+        self.matrix = None
+        if _numpy() is not None:
+            self.matrix = np.zeros((len(self.rows), len(columns)))
+            for column, entries in enumerate(postings):
+                for row, count in entries:
+                    self.matrix[row, column] = count
+
+    def found_counts(self, hits):
+        """Found entries per row for {keyword: offsets} hits of the combined index"""
+        if self.matrix is not None:
+            vector = np.zeros(len(self.columns))
+            vector[[self.columns[keyword] for keyword in hits]] = 1.0
+            return [int(count) for count in self.matrix @ vector]
+        counts = [0] * len(self.rows)
+        for keyword in hits:
+            for row, count in self.postings[self.columns[keyword]]:
+                counts[row] += count
+        return counts
+
+def role_matrix(profiles):
+    """The RoleMatrix for these profiles, built once and shared while they are unchanged"""
+    key = tuple((profile['name'], profile['digest']) for profile in profiles)
+    matrix = _matrices.get(key)
+    if matrix is None:
+        matrix = RoleMatrix(profiles)
+        with _matrices_lock:
+            while len(_matrices) >= max(ROLE_MATRIX_CACHE, 1):
+                _matrices.pop(next(iter(_matrices)))
+            _matrices[key] = matrix
+    return matrix
+
+def rank_roles(document, profiles, contact_score, length_score, achievement_score, top=None):
+    """Score a Document against every profile and return the best-fit roles, best first.
+
+    The component scores are the profile-independent parts of the final
+    score. Each role entry carries its final, keyword and category scores as
+    /analyze would report them for that profile.
+    """
+    top = ROLES_TOP if top is None else top
+    matrix = role_matrix(profiles)
+    hits = match_keywords(document.text, matrix.index, document.lower)
+    counts = matrix.found_counts(hits)
+
+    roles = []
+    found = [0] * len(profiles)
+    possible = [0] * len(profiles)
+    category_scores = [{} for _ in profiles]
+    for row, (position, category) in enumerate(matrix.rows):
+        found[position] += counts[row]
+        possible[position] += matrix.possible[row]
+        category_possible = matrix.possible[row]
+        category_scores[position][category] = (
+            round((counts[row] / category_possible) * 100, 1) if category_possible > 0 else 0
+        )
+    for position, profile in enumerate(profiles):
+        keyword_score = round((found[position] / possible[position]) * 100, 1) if possible[position] > 0 else 0
+        roles.append({
+            'profile': profile['name'],
+            'version': profile['version'],
+            'description': profile['description'],
+            'final_score': final_score(
+                profile['weights'], keyword_score, contact_score, length_score, achievement_score
+            ),
+            'keyword_score': keyword_score,
+            'category_scores': category_scores[position],
+            'keywords_found': found[position],
+            'keywords_total': possible[position]
+        })
+
+    roles.sort(key=lambda role: (-role['final_score'], -role['keyword_score'], role['profile']))
+    if top > 0:
+        roles = roles[:top]
+    for rank, role in enumerate(roles, 1):
+        role['rank'] = rank
+    return roles
@@ -0,0 +1,219 @@
+import os
+import json
+import time
+import sqlite3
+import tempfile
+import threading
+
+# ============================================
+# RESUME SEARCH INDEX
+# ============================================
+# Every fresh analysis is stored in a local SQLite database: the extracted
+# text and found keywords go into an FTS5 full-text index, scores and contact
+# flags into an ordinary table with B-tree indexes, and found keywords into a
+# (keyword, resume) table for exact filters. Queries combine those indexes,
+# so their cost follows the number of matches rather than the corpus size.
+
+SEARCH_DB = os.environ.get('ATS_SEARCH_DB', os.path.join(tempfile.gettempdir(), 'ats_search.sqlite3'))
+SEARCH_INDEX = os.environ.get('ATS_SEARCH_INDEX', '1').lower() not in ('0', 'false', 'no')
+SEARCH_MAX_PER_PAGE = int(os.environ.get('ATS_SEARCH_MAX_PER_PAGE', '100'))
+# Matches are only counted up to this many; broad queries report a lower bound
+SEARCH_COUNT_LIMIT = int(os.environ.get('ATS_SEARCH_COUNT_LIMIT', '1000'))
+
+FLAG_COLUMNS = ('has_email', 'has_phone', 'linkedin', 'github', 'portfolio', 'qr_code')
+SORT_ORDERS = {
+    'score': 'r.final_score DESC, r.id DESC',
+    # Ids grow with indexing time (a replaced resume gets a new one)
+    'recent': 'r.id DESC',
+    'relevance': 'bm25(resume_fts), r.id DESC'
+}
+
+_initialized_pid = None
+_init_lock = threading.Lock()
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS resumes (
+    id INTEGER PRIMARY KEY,
+    digest TEXT NOT NULL,
+    profile TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    final_score REAL NOT NULL,
+    rating TEXT,
+    word_count INTEGER,
+    found_keywords TEXT NOT NULL,
+    has_email INTEGER NOT NULL,
+    has_phone INTEGER NOT NULL,
+    linkedin INTEGER NOT NULL,
+    github INTEGER NOT NULL,
+    portfolio INTEGER NOT NULL,
+    qr_code INTEGER NOT NULL,
+    indexed REAL NOT NULL,
+    UNIQUE (digest, profile)
+);
+CREATE INDEX IF NOT EXISTS resumes_score ON resumes (final_score);
+CREATE TABLE IF NOT EXISTS resume_keywords (
+    keyword TEXT NOT NULL,
+    category TEXT NOT NULL,
+    resume_id INTEGER NOT NULL,
+    PRIMARY KEY (keyword, category, resume_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS resume_keywords_resume ON resume_keywords (resume_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS resume_fts USING fts5(text, keywords, tokenize="unicode61 tokenchars '+#'");
+'''
+
+def _connect():
+    conn = sqlite3.connect(SEARCH_DB, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+def init_db():
+    """Create the index tables once per process"""
+    global _initialized_pid
+    if _initialized_pid == os.getpid():
+        return
+    with _init_lock:
+        if _initialized_pid == os.getpid():
+            return
+        os.makedirs(os.path.dirname(SEARCH_DB) or '.', exist_ok=True)
+        conn = _connect()
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(_SCHEMA)
+        finally:
+            conn.close()
+        _initialized_pid = os.getpid()
+
+def index_resume(digest, filename, profile_name, analysis, text):
+    """Store (or replace) one analyzed upload in the index"""
+    init_db()
+    contact = analysis['contact_info']
+    found_keywords = analysis['found_keywords']
+    conn = _connect()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        old = conn.execute(
+            'SELECT id FROM resumes WHERE digest = ? AND profile = ?', (digest, profile_name)
+        ).fetchone()
+        if old:
+            conn.execute('DELETE FROM resume_fts WHERE rowid = ?', (old['id'],))
+            conn.execute('DELETE FROM resume_keywords WHERE resume_id = ?', (old['id'],))
+            conn.execute('DELETE FROM resumes WHERE id = ?', (old['id'],))
+        resume_id = conn.execute(
+            'INSERT INTO resumes (digest, profile, filename, final_score, rating, word_count, found_keywords, '
+            'has_email, has_phone, linkedin, github, portfolio, qr_code, indexed) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (digest, profile_name, filename, analysis['final_score'], analysis.get('rating'),
+             analysis.get('word_count'), json.dumps(found_keywords),
+             bool(contact['email']), bool(contact['phone']), contact['linkedin'], contact['github'],
+             contact['portfolio'], contact['qr_code'], time.time())
+        ).lastrowid
+        keywords = [entry for entries in found_keywords.values() for entry in entries]
+        conn.execute(
+            'INSERT INTO resume_fts (rowid, text, keywords) VALUES (?, ?, ?)',
+            (resume_id, text, '\n'.join(keywords))
+        )
+        conn.executemany(
+            'INSERT OR IGNORE INTO resume_keywords (keyword, category, resume_id) VALUES (?, ?, ?)',
+            [(entry.lower(), category, resume_id) for category, entries in found_keywords.items() for entry in entries]
+        )
+        conn.execute('COMMIT')
+        return resume_id
+    except sqlite3.Error:
+        if conn.in_transaction:
+            conn.execute('ROLLBACK')
+        raise
+    finally:
+        conn.close()
+
+def search(query=None, keywords=(), category=None, profile=None, min_score=None, max_score=None,
+           flags=None, sort='score', page=1, per_page=20):
+    """Return one page of indexed resumes matching every given filter, plus the match count.
+
+    `query` uses the FTS5 syntax over text and keywords (AND/OR/NOT, "phrases",
+    prefix*, keywords:term); `keywords` must all have been found by the
+    analysis (optionally within `category`); `flags` maps contact flag names
+    to required truth values. `total` stops at SEARCH_COUNT_LIMIT, in which
+    case `total_exact` is false. Raises ValueError for invalid arguments.
+    """
+    if sort not in SORT_ORDERS or (sort == 'relevance' and not query):
+        raise ValueError('sort must be score, recent or relevance (relevance needs a query)')
+    if page < 1 or not 1 <= per_page <= SEARCH_MAX_PER_PAGE:
+        raise ValueError(f'page must be positive and per_page between 1 and {SEARCH_MAX_PER_PAGE}')
+
+    clauses = []
+    params = []
+    source = 'resumes r'
+    columns = 'r.*'
+    if query:
+        source = 'resume_fts JOIN resumes r ON r.id = resume_fts.rowid'
+        columns = "r.*, snippet(resume_fts, 0, '[', ']', '…', 12) AS snippet"
+        clauses.append('resume_fts MATCH ?')
+        params.append(query)
+    for keyword in keywords:
+        if category:
+            clauses.append('r.id IN (SELECT resume_id FROM resume_keywords WHERE keyword = ? AND category = ?)')
+            params.extend([keyword.lower(), category])
+        else:
+            clauses.append('r.id IN (SELECT resume_id FROM resume_keywords WHERE keyword = ?)')
+            params.append(keyword.lower())
+    if profile:
+        clauses.append('r.profile = ?')
+        params.append(profile)
+    if min_score is not None:
+        clauses.append('r.final_score >= ?')
+        params.append(min_score)
+    if max_score is not None:
+        clauses.append('r.final_score <= ?')
+        params.append(max_score)
+    for flag, value in (flags or {}).items():
+        if flag not in FLAG_COLUMNS:
+            raise ValueError(f'Unknown contact flag: {flag}')
+        clauses.append(f'r.{flag} = ?')
+        params.append(1 if value else 0)
+    where = ' WHERE ' + ' AND '.join(clauses) if clauses else ''
+    order = SORT_ORDERS[sort]
+    if query and sort == 'recent':
+        # Lets FTS5 return its matches newest first instead of sorting them all
+        order = 'resume_fts.rowid DESC'
+
+    init_db()
+    conn = _connect()
+    try:
+        total = conn.execute(
+            f'SELECT COUNT(*) FROM (SELECT 1 FROM {source}{where} LIMIT ?)', params + [SEARCH_COUNT_LIMIT + 1]
+        ).fetchone()[0]
+        rows = conn.execute(
+            f'SELECT {columns} FROM {source}{where} ORDER BY {order} LIMIT ? OFFSET ?',
+            params + [per_page, (page - 1) * per_page]
+        ).fetchall()
+    except sqlite3.OperationalError as e:
+        if query and 'fts5' in str(e):
+            raise ValueError(str(e))
+        raise
+    finally:
+        conn.close()
+
+    results = []
+    for row in rows:
+        result = {
+            'id': row['id'],
+            'digest': row['digest'],
+            'filename': row['filename'],
+            'profile': row['profile'],
+            'final_score': row['final_score'],
+            'rating': row['rating'],
+            'word_count': row['word_count'],
+            'found_keywords': json.loads(row['found_keywords']),
+            'contact': {flag: bool(row[flag]) for flag in FLAG_COLUMNS},
+            'indexed': row['indexed']
+        }
+        if query:
+            result['snippet'] = row['snippet']
+        results.append(result)
+    return {
+        'total': min(total, SEARCH_COUNT_LIMIT),
+        'total_exact': total <= SEARCH_COUNT_LIMIT,
+        'page': page,
+        'per_page': per_page,
+        'results': results
+    }
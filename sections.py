@@ -0,0 +1,49 @@
+import re
+
+# ============================================
+# RESUME SECTIONS
+# ============================================
+# Splits resume text at its section headings ("Experience", "SKILLS:", ...).
+# Sections are contiguous and keep their line breaks, so joining their texts
+# gives back the original text and offsets can be shifted by section start.
+
+SECTION_TITLES = {
+    'summary', 'professional summary', 'profile', 'objective', 'career objective', 'about me',
+    'experience', 'work experience', 'professional experience', 'employment', 'employment history',
+    'internships', 'internship', 'education', 'academic background', 'qualifications',
+    'skills', 'technical skills', 'key skills', 'core competencies', 'projects', 'academic projects',
+    'achievements', 'awards', 'honors', 'honours', 'awards and achievements', 'honors and awards',
+    'certifications', 'certificates', 'courses', 'training', 'publications', 'research',
+    'leadership', 'activities', 'extracurricular activities', 'volunteering', 'volunteer experience',
+    'languages', 'interests', 'hobbies', 'references', 'contact', 'personal details'
+}
+# The part before the first heading (name, contact details) gets this title
+PREAMBLE = 'preamble'
+
+_HEADING_PATTERN = re.compile(r'[^a-z& ]+')
+
+def section_title(line):
+    """Return the normalized title if the line is a section heading, else None"""
+    stripped = line.strip()
+    if not stripped or len(stripped) > 40:
+        return None
+    title = ' '.join(_HEADING_PATTERN.sub(' ', stripped.lower()).replace('&', 'and').split())
+    return title if title in SECTION_TITLES else None
+
+def split_sections(text):
+    """Split text into [(title, start offset, section text)] covering the whole text in order"""
+    sections = []
+    title = PREAMBLE
+    start = 0
+    position = 0
+    for line in text.splitlines(keepends=True):
+        heading = section_title(line)
+        if heading is not None and position > start:
+            sections.append((title, start, text[start:position]))
+            start = position
+        if heading is not None:
+            title = heading
+        position += len(line)
+    if position > start or not sections:
+        sections.append((title, start, text[start:]))
+    return sections
@@ -0,0 +1,104 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import tempfile
+import threading
+
+# ============================================
+# RESCORING SESSIONS
+# ============================================
+# A session keeps the sections of the last version of a resume together with
+# their keyword matches and the last analysis, so an edited version only has
+# its changed sections matched again. Sessions live in SQLite so any web
+# worker can continue one, and expire SESSION_TTL seconds after their last use.
+
+SESSION_DB = os.environ.get('ATS_SESSION_DB', os.path.join(tempfile.gettempdir(), 'ats_sessions.sqlite3'))
+SESSION_TTL = int(os.environ.get('ATS_SESSION_TTL', '3600'))
+
+_initialized_pid = None
+_init_lock = threading.Lock()
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY,
+    profile TEXT NOT NULL,
+    state TEXT NOT NULL,
+    created REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_updated ON sessions (updated);
+'''
+
+def _connect():
+    conn = sqlite3.connect(SESSION_DB, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+def init_db():
+    """Create the session table once per process"""
+    global _initialized_pid
+    if _initialized_pid == os.getpid():
+        return
+    with _init_lock:
+        if _initialized_pid == os.getpid():
+            return
+        os.makedirs(os.path.dirname(SESSION_DB) or '.', exist_ok=True)
+        conn = _connect()
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(_SCHEMA)
+        finally:
+            conn.close()
+        _initialized_pid = os.getpid()
+
+def create_session(profile_name, state):
+    """Store a new session's state and return its id"""
+    init_db()
+    session_id = uuid.uuid4().hex
+    now = time.time()
+    conn = _connect()
+    try:
+        conn.execute('DELETE FROM sessions WHERE updated < ?', (now - SESSION_TTL,))
+        conn.execute(
+            'INSERT INTO sessions (id, profile, state, created, updated) VALUES (?, ?, ?, ?, ?)',
+            (session_id, profile_name, json.dumps(state), now, now)
+        )
+    finally:
+        conn.close()
+    return session_id
+
+def load_session(session_id):
+    """Return {'profile', 'state', 'created'} for a live session, or None"""
+    init_db()
+    conn = _connect()
+    try:
+        row = conn.execute(
+            'SELECT profile, state, created FROM sessions WHERE id = ? AND updated >= ?',
+            (session_id, time.time() - SESSION_TTL)
+        ).fetchone()
+    finally:
+        conn.close()
+    if row is None:
+        return None
+    return {'profile': row['profile'], 'state': json.loads(row['state']), 'created': row['created']}
+
+def save_session(session_id, state):
+    init_db()
+    conn = _connect()
+    try:
+        conn.execute(
+            'UPDATE sessions SET state = ?, updated = ? WHERE id = ?',
+            (json.dumps(state), time.time(), session_id)
+        )
+    finally:
+        conn.close()
+
+def delete_session(session_id):
+    init_db()
+    conn = _connect()
+    try:
+        return conn.execute('DELETE FROM sessions WHERE id = ?', (session_id,)).rowcount > 0
+    finally:
+        conn.close()